@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import time
+
+# Database files are relative paths, so everything runs inside a scratch folder
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from config import *
+from core.database import Database, SCHEMA_VERSION
+from core.sqlite_store import SqliteDatabase
+
+def make_ratings(post_count):
+    """Random ratings for post_count posts"""
+    base = 100000000
+    points = {str(base + i): random.randint(1, 20) for i in range(post_count)}
+    nice = {str(base + i): random.randint(1, 5) for i in range(0, post_count, 3)}
+    return points, nice
+
+def report(name, startup, latencies):
+    latencies.sort()
+    avg = sum(latencies) / len(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:>7}: startup {startup * 1000:9.1f} ms | "
+          f"write avg {avg * 1e6:8.1f} us, p99 {p99 * 1e6:8.1f} us, max {latencies[-1] * 1e6:8.1f} us")
+
+def time_clicks(db, post_ids, clicks):
+    latencies = []
+    for _ in range(clicks):
+        post_id = random.choice(post_ids)
+        start = time.perf_counter()
+        db.add_point(post_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def bench_json(points, nice, clicks):
+    with open(POINTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(points, f, indent=2)
+    with open(NICE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(nice, f, indent=2)
+    with open(DB_META_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'schema_version': SCHEMA_VERSION}, f)
+    
+    start = time.perf_counter()
+    db = Database()
+    startup = time.perf_counter() - start
+    
+    latencies = time_clicks(db, list(points), clicks)
+    db.close()
+    report('json', startup, latencies)
+
+def bench_sqlite(points, nice, clicks):
+    for filename in (POINTS_FILE, NICE_FILE, DB_META_FILE, JOURNAL_FILE):
+        if os.path.exists(filename):
+            os.remove(filename)
+    
+    db = SqliteDatabase()
+    start = time.perf_counter()
+    db.import_ratings(points, nice)
+    db.migrate_to_post_based()
+    print(f" sqlite: import of {len(points)} posts took {time.perf_counter() - start:.1f} s")
+    db.close()
+    
+    start = time.perf_counter()
+    db = SqliteDatabase()
+    startup = time.perf_counter() - start
+    
+    latencies = time_clicks(db, list(points), clicks)
+    db.close()
+    report('sqlite', startup, latencies)
+
+def main():
+    post_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    clicks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    
+    print(f"=== DATABASE BENCHMARK: {post_count} posts, {clicks} clicks ===")
+    points, nice = make_ratings(post_count)
+    
+    workdir = tempfile.mkdtemp(prefix='pixiv_db_bench_')
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        bench_json(points, nice, clicks)
+        bench_sqlite(points, nice, clicks)
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from config import *
+from core.file_manager import FileManager, scan_tree, shard_folder
+
+def make_library(folder, file_count, layout):
+    """Empty files named like Pixiv downloads, 1-3 pages per post"""
+    base = 100000000
+    created = 0
+    post = 0
+    while created < file_count:
+        post_id = str(base + post * 7)
+        for page in range(post % 3 + 1):
+            filename = f"{post_id}_p{page}-title-artist-{post % 5000}.jpg"
+            target = folder
+            if layout == 'sharded':
+                target = os.path.join(folder, shard_folder(post_id))
+                if page == 0:
+                    os.makedirs(target, exist_ok=True)
+            open(os.path.join(target, filename), 'wb').close()
+            created += 1
+        post += 1
+    return created
+
+def listdir_scan(folder):
+    """The old scan: listdir + one isfile stat per entry, top level only"""
+    return sum(1 for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f)))
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def bench_layout(workdir, file_count, layout):
+    folder = os.path.join(workdir, layout)
+    os.makedirs(folder)
+    seconds, _ = time_it(make_library, folder, file_count, layout)
+    print(f"\n{layout}: created {file_count} files in {seconds:.1f} s")
+
+    if layout == 'flat':
+        seconds, count = time_it(listdir_scan, folder)
+        print(f"  listdir + isfile : {seconds * 1000:9.1f} ms ({count} files)")
+
+    seconds, count = time_it(lambda: sum(1 for _ in scan_tree(folder)))
+    print(f"  scandir walk     : {seconds * 1000:9.1f} ms ({count} files)")
+
+    # Full load: scan, parse and group
+    roots = [{'path': folder, 'read_only': True, 'layout': layout}]
+    seconds, manager = time_it(FileManager, roots)
+    print(f"  FileManager load : {seconds * 1000:9.1f} ms ({len(manager.all_files)} files)")
+
+    # Opening single files, as the viewer does
+    sample = manager.all_files[::max(1, len(manager.all_files) // 2000)]
+    seconds, _ = time_it(lambda: [os.stat(f['full_path']) for f in sample])
+    print(f"  stat per file    : {seconds / len(sample) * 1e6:9.1f} us")
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    workdir = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print(f"=== LIBRARY SCAN BENCHMARK: {file_count} files ===")
+    # Pass a folder on the library drive - tmp may be a RAM disk
+    workdir = tempfile.mkdtemp(prefix='pixiv_scan_bench_', dir=workdir)
+    try:
+        bench_layout(workdir, file_count, 'flat')
+        bench_layout(workdir, file_count, 'sharded')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
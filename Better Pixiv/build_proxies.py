@@ -0,0 +1,15 @@
+from core.file_manager import FileManager
+from core.video_proxy import ProxyBuilder
+
+def build_proxies():
+    print("=== BUILDING VIDEO PROXIES ===")
+    file_manager = FileManager()
+    
+    video_paths = [f['full_path'] for f in file_manager.all_files if f['is_video']]
+    print(f"\nChecking {len(video_paths)} video files")
+    
+    ProxyBuilder().build(video_paths)
+    print("\nDone!")
+
+if __name__ == "__main__":
+    build_proxies()
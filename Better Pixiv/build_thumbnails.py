@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+from config import *
+from core.file_manager import FileManager
+from core.thumb_pack import ThumbnailPack
+from core.thumbnail_cache import thumbnail_key, render_thumbnail, encode_thumbnail
+from core.archive import media_stat
+
+def build_one(job):
+    """Worker process: render one thumbnail and return its encoded bytes"""
+    key, file_info, size = job
+    try:
+        return key, encode_thumbnail(render_thumbnail(file_info, size)), None
+    except Exception as e:
+        return key, None, f"{file_info['filename']}: {e}"
+
+def build_thumbnails(size=THUMBNAIL_SIZE):
+    print("=== BUILDING THUMBNAIL PACKS ===")
+    file_manager = FileManager()
+    pack = ThumbnailPack()
+    if pack.read_only:
+        print("ERROR: The thumbnail packs are in use (viewer or ingest running) - close it first")
+        pack.close()
+        return
+    
+    # Anything already in the pack index is done - this makes the build resumable
+    jobs = []
+    for file_info in file_manager.all_files:
+        try:
+            key = thumbnail_key(file_info['full_path'], size, media_stat(file_info))
+        except OSError:
+            continue
+        if key not in pack:
+            jobs.append((key, file_info, size))
+    
+    print(f"\n{len(pack)} thumbnails already packed, {len(jobs)} to build")
+    
+    done = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=THUMB_BUILD_WORKERS) as pool:
+        for key, data, error in pool.map(build_one, jobs, chunksize=64):
+            done += 1
+            if data is None:
+                failed += 1
+                print(f"FAILED: {error}")
+            else:
+                pack.append(key, data)
+            
+            if done % 1000 == 0 or done == len(jobs):
+                print(f"[{done}/{len(jobs)}] {failed} failed")
+    
+    pack.close()
+    print("\nDone!")
+
+if __name__ == "__main__":
+    build_thumbnails()
@@ -6,19 +6,98 @@ FIXED_FOLDER_PATH = "D:/pixiv"
 JUNKO_FOLDER = "Junko"
 SFW_FOLDER = "sfw"
 
+# Library layout: 'flat' (files directly in the root) or 'sharded'
+# (<root>/<last SHARD_DIGITS of the post ID>/<file>). Both are scanned the
+# same way; the layout decides where moved files go. shard_library.py converts.
+LIBRARY_LAYOUT = 'flat'
+SHARD_DIGITS = 2
+
+# Library roots, scanned in parallel and merged into one view.
+# Earlier roots win if the same file is in several. Read-only roots are never
+# deleted from or moved out of. A root can set its own 'layout'.
+LIBRARY_ROOTS = [
+    {'path': FIXED_FOLDER_PATH, 'read_only': False},
+    {'path': os.path.join(FIXED_FOLDER_PATH, SFW_FOLDER), 'read_only': False},
+    {'path': os.path.join(FIXED_FOLDER_PATH, JUNKO_FOLDER), 'read_only': False},
+]
+
+# Library watcher: files added/removed outside the app show up without a restart
+WATCH_LIBRARY = True
+WATCH_BACKEND = 'auto'    # 'auto' (inotify where available, else polling), 'inotify' or 'poll'
+WATCH_POLL_SECONDS = 2.0  # Polling: how often folder mtimes are checked
+WATCH_APPLY_MS = 500      # How often the UI applies queued changes
+WATCH_BATCH = 2000        # Max changes applied per round, so a big copy can't freeze the UI
+
+# Ingest: the downloader's staging folder is moved into the first library root
+# (python ingest.py, or in the background while the viewer runs)
+INGEST_STAGING_FOLDER = None   # e.g. "D:/pixiv_staging"
+INGEST_BACKGROUND = False      # Let the viewer ingest by itself
+INGEST_INTERVAL_SECONDS = 30   # How often the viewer checks the staging folder
+INGEST_SETTLE_SECONDS = 5      # Files modified more recently may still be downloading
+INGEST_BUILD_PROXIES = True    # ingest.py: transcode heavy videos afterwards
+
 # Files
 POINTS_FILE = "points.json"
 NICE_FILE = "nice.json"
+JOURNAL_FILE = "ratings.journal"  # Append-only log of changes since the last snapshot
+DB_META_FILE = "db_meta.json"     # Schema version of the JSON storage
+SESSION_FILE = "session.json"     # Random order, mode, artist and history of the last run
+DATABASE_SQLITE_FILE = "ratings.db"
+
+# Database persistence settings
+DATABASE_BACKEND = 'json'         # 'json' (points.json/nice.json) or 'sqlite'
+JOURNAL_FSYNC_INTERVAL = 1.0      # Max seconds a click waits in memory before it is fsync'd
+JOURNAL_COMPACT_ENTRIES = 1000    # Compact journal into the snapshots after this many entries
+
+# Browse orders, cycled with the O key ('random' is the startup shuffle)
+BROWSE_ORDERS = ('random', 'shuffle', 'points', 'nice', 'post_id', 'mtime', 'pages')
+
+# Smart shuffle: weight = 1 + points/nice bonus + up to RECENCY for the newest post
+SHUFFLE_POINTS_WEIGHT = 1.0
+SHUFFLE_NICE_WEIGHT = 3.0
+SHUFFLE_RECENCY_WEIGHT = 2.0
+SHUFFLE_NO_REPEAT = 200     # Posts shown this recently are not drawn again
+SHUFFLE_HISTORY = 1000      # Drawn posts remembered for going back
+
+# Navigation history / session
+HISTORY_SIZE = 500          # Back/forward entries kept
+RESTORE_SESSION = True      # Reopen the last post at startup
+
+# Decode / I/O scheduler shared by viewer, video, thumbnails and prefetch
+SCHEDULER_WORKERS = None        # None = one per CPU core
+SCHEDULER_RESERVED_WORKERS = 1  # Only ever used for the visible image and video frames
+SCHEDULER_DISK_LIMIT = 2        # Concurrent tasks reading from the same disk
+
+# Held arrow keys: skim thumbnails, load full resolution once navigation settles
+NAV_SKIM_THRESHOLD_MS = 100  # Navigations closer together than this start skimming
+NAV_SETTLE_MS = 150          # Quiet time before the full-resolution load
+
+# Prefetching of neighbouring posts
+PREFETCH_RADIUS = 2         # Posts warmed on each side of the current one
+PREFETCH_DECODE = 2         # Upcoming files fully decoded ahead of time
+READAHEAD_FILES = 8         # Upcoming files read ahead into the OS cache
+READAHEAD_BUDGET_MB = 256   # Max bytes read ahead per navigation
+PREFETCH_CHUNK = 1024 * 1024
 
 # Supported formats
 SUPPORTED_IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
 SUPPORTED_VIDEO_EXTS = ('.webm', '.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.m4v', '.3gp')
+SUPPORTED_UGOIRA_EXTS = ('.zip',)  # Pixiv ugoira: zip of frames (+ frame delays)
+ARCHIVE_EXTS = ('.zip', '.cbz')    # Archived posts, indexed like folders (ugoira zips excluded)
 
 # UI Settings
 THUMBNAIL_SIZE = 120
 SIDEBAR_WIDTH = 150
+SIDEBAR_ROW_HEIGHT = 150    # One page thumbnail row (140 + padding)
 MAIN_WINDOW_SIZE = "1600x900"
 
+# Artist grid settings
+GRID_CELL_WIDTH = THUMBNAIL_SIZE + 30
+GRID_CELL_HEIGHT = THUMBNAIL_SIZE + 60
+GRID_OVERSCAN_ROWS = 2      # Extra rows kept alive above/below the view
+GRID_SCROLL_STEP = 20       # Pixels per scroll unit
+GRID_WHEEL_STEPS = 3        # Scroll units per wheel notch
+
 # Zoom settings
 ZOOM_MIN = 0.1
 ZOOM_MAX = 5.0
@@ -30,10 +109,48 @@ ZOOM_ANIMATION_DELAY = 20
 VIDEO_FPS = 30
 VIDEO_BUFFER_SIZE = 10
 
+# Ugoira settings
+UGOIRA_FRAME_BUFFER = 24    # Max decoded frames kept in memory
+UGOIRA_DEFAULT_DELAY = 100  # ms per frame when the zip has no delay metadata
+
+# Animated GIF/WebP settings
+ANIMATION_CACHE_MB = 256        # Decoded frame budget per animation
+ANIMATION_DEFAULT_DELAY = 100   # ms per frame when the file has no duration
+
+# Hover preview settings (artist grid)
+HOVER_PREVIEW_FPS = 12      # Decoded frames per second while hovering
+HOVER_MAX_DECODERS = 1      # Shared budget of concurrent hover decoders
+HOVER_SKIM_SECONDS = 2.0    # Oversized videos without a proxy: one preview frame per this much video...
+HOVER_SKIM_FPS = 3          # ...shown this many times a second
+
+# Video proxy settings
+CACHE_DIR = "cache"
+PROXY_CACHE_DIR = os.path.join(CACHE_DIR, "proxies")
+PROXY_PROGRESS_FILE = os.path.join(PROXY_CACHE_DIR, "progress.json")
+PROXY_MIN_SIZE_MB = 200     # Videos larger than this get a proxy
+PROXY_MAX_WIDTH = 1920      # Videos larger than this get a proxy...
+PROXY_MAX_HEIGHT = 1080     # ...and are scaled down to fit this box
+PROXY_WORKERS = None        # None = one process per CPU core
+
+# Thumbnail cache settings
+THUMB_PACK_DIR = os.path.join(CACHE_DIR, "thumbpacks")
+THUMB_PACK_MAX_MB = 256     # Size at which a new pack file is started
+THUMB_CACHE_QUALITY = 85    # JPEG quality of cached thumbnails
+THUMB_MEMORY_ITEMS = 2000   # Ready PhotoImages kept in memory (LRU)
+THUMB_BUILD_WORKERS = None  # Bulk builder processes (None = one per CPU core)
+
+# Archive settings
+ARCHIVE_POOL_SIZE = 16      # Archives kept open (central directory read once)
+ARCHIVE_MEDIA_CACHE_DIR = os.path.join(CACHE_DIR, "archive_media")  # Videos/animations extracted for playback
+ARCHIVE_MEDIA_CACHE_MB = 2048  # Least recently played extractions are deleted beyond this
+
 # Debug settings - SET TO FALSE TO REDUCE CONSOLE OUTPUT
 DEBUG_MODE = False
 PRINT_VIDEO_INFO = False  # Set to False to reduce video messages
 PRINT_LOAD_INFO = True    # Keep basic loading info
+LATENCY_MONITOR = DEBUG_MODE     # Report how long the UI thread is blocked
+LATENCY_MONITOR_INTERVAL_MS = 10
+LATENCY_WARN_MS = 50
 
 # Create special folders
 os.makedirs(os.path.join(FIXED_FOLDER_PATH, JUNKO_FOLDER), exist_ok=True)
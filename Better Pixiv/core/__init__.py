@@ -4,5 +4,6 @@ Core functionality modules
 from .file_manager import FileManager, parse_filename
 from .database import Database
 from .state_manager import AppState
+from .video_proxy import ProxyBuilder, get_proxy_path
 
-__all__ = ['FileManager', 'parse_filename', 'Database', 'AppState']
\ No newline at end of file
+__all__ = ['FileManager', 'parse_filename', 'Database', 'AppState', 'ProxyBuilder', 'get_proxy_path']
\ No newline at end of file
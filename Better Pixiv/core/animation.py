@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from PIL import Image
+from config import ANIMATION_CACHE_MB, ANIMATION_DEFAULT_DELAY
+
+class FrameBuffer:
+    """Thread-safe bounded cache of decoded frames keyed by frame index"""
+
+    def __init__(self, max_frames):
+        self.max_frames = max(1, max_frames)
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, idx):
+        with self.lock:
+            frame = self.frames.get(idx)
+            if frame is not None:
+                self.frames.move_to_end(idx)
+            return frame
+
+    def put(self, idx, frame):
+        with self.lock:
+            self.frames[idx] = frame
+            self.frames.move_to_end(idx)
+            while len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+
+    def __contains__(self, idx):
+        with self.lock:
+            return idx in self.frames
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+
+class AnimationSource:
+    """
+    Base class for animations decoded lazily by a worker thread.
+    Subclasses fill frame_count/delays and implement decode_frame.
+    """
+
+    def __init__(self, buffer_size):
+        self.frame_count = 0
+        self.delays = []  # Per-frame delay in milliseconds
+        self.buffer = FrameBuffer(buffer_size)
+        self.failed = set()
+
+        self.playhead = 0
+        self.active = False
+        self.wake = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the decode worker"""
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def get_frame(self, idx):
+        """Get a decoded frame (None if not ready yet) and move the playhead there"""
+        if idx != self.playhead:
+            self.playhead = idx
+            self.wake.set()
+        return self.buffer.get(idx)
+
+    def get_delay(self, idx):
+        """Delay in ms before showing the frame after idx"""
+        if 0 <= idx < len(self.delays):
+            return self.delays[idx]
+        return 100
+
+    def total_duration(self):
+        """Total animation length in seconds"""
+        return sum(self.delays) / 1000.0
+
+    def next_wanted(self):
+        """Next frame ahead of the playhead that still needs decoding"""
+        lookahead = min(self.frame_count, self.buffer.max_frames - 1) or 1
+        for offset in range(lookahead):
+            idx = (self.playhead + offset) % self.frame_count
+            if idx not in self.buffer and idx not in self.failed:
+                return idx
+        return None
+
+    def worker(self):
+        """Decode frames just ahead of the playhead until closed"""
+        while self.active:
+            idx = self.next_wanted() if self.frame_count else None
+            if idx is None:
+                self.wake.wait(0.05)
+                self.wake.clear()
+                continue
+
+            try:
+                frame = self.decode_frame(idx)
+            except Exception as e:
+                if self.active:
+                    print(f"Error decoding frame {idx}: {e}")
+                    self.failed.add(idx)
+                continue
+
+            if self.active:
+                self.buffer.put(idx, frame)
+
+    def decode_frame(self, idx):
+        raise NotImplementedError
+
+    def close(self):
+        """Stop the worker and drop all decoded frames"""
+        self.active = False
+        self.wake.set()
+        self.buffer.clear()
+
+class AnimatedImageSource(AnimationSource):
+    """
+    Animated GIF/WebP streamed frame by frame.
+    Frames are only decoded when the playhead gets close to them.
+    """
+
+    def __init__(self, path, max_bytes=ANIMATION_CACHE_MB * 1024 * 1024):
+        image = Image.open(path)
+        frame_count = getattr(image, 'n_frames', 1)
+
+        # Every frame has the same size, so the byte budget is a frame budget
+        w, h = image.size
+        frame_bytes = max(1, w * h * 3)
+        super().__init__(max(2, min(frame_count, max_bytes // frame_bytes)))
+
+        self.path = path
+        self.image = image
+        self.frame_count = frame_count
+
+        # Real durations are read as frames get decoded
+        self.delays = [self.image.info.get('duration') or ANIMATION_DEFAULT_DELAY] * self.frame_count
+
+    def decode_frame(self, idx):
+        # Only the decode worker touches the image after the first frame
+        self.image.seek(idx)
+        frame = self.image.convert('RGB')
+
+        duration = self.image.info.get('duration')
+        if duration:
+            self.delays[idx] = max(10, duration)
+        return frame
+
+    def close(self):
+        super().close()
+        self.image.close()
@@ -0,0 +1,251 @@
+import os
+import io
+import mmap
+import struct
+import hashlib
+import zipfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import *
+
+# Local file header: signature ... file name length, extra field length
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+LOCAL_SIGNATURE = b'PK\x03\x04'
+
+def list_archive(path):
+    """Names of the files in an archive (folders left out)"""
+    with zipfile.ZipFile(path) as zf:
+        return [info.filename for info in zf.infolist() if not info.is_dir()]
+
+class MemberView:
+    """
+    Read-only file object over a stored member: a window on the archive's
+    mmap, so bytes are only copied as the decoder asks for them.
+    """
+
+    def __init__(self, mm, start, size, on_close=None):
+        self.mm = mm
+        self.start = start
+        self.size = size
+        self.pos = 0
+        self.on_close = on_close
+        self.closed = False
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self.size, self.pos + n)
+        data = self.mm[self.start + self.pos:self.start + end] if end > self.pos else b''
+        self.pos = max(self.pos, end)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            if self.on_close:
+                self.on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ArchiveHandle:
+    """One open archive: ZipFile for the directory and compressed members, mmap for stored ones"""
+
+    def __init__(self, path):
+        st = os.stat(path)
+        self.path = path
+        self.signature = (st.st_size, st.st_mtime_ns)
+        self.file = open(path, 'rb')
+        try:
+            self.zip = zipfile.ZipFile(self.file)
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        self.lock = threading.Lock()  # ZipFile reads share the file position
+        self.users = 0
+        self.retired = False
+
+    def data_offset(self, info):
+        """Start of a member's data (the local header may differ from the central one)"""
+        header = LOCAL_HEADER.unpack_from(self.mmap, info.header_offset)
+        if header[0] != LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        return info.header_offset + LOCAL_HEADER.size + header[10] + header[11]
+
+    def open_member(self, member, on_close):
+        info = self.zip.getinfo(member)
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            return MemberView(self.mmap, self.data_offset(info), info.file_size, on_close)
+
+        # Compressed: inflate once, decoders seek around freely afterwards
+        try:
+            with self.lock:
+                data = self.zip.read(info)
+        finally:
+            on_close()
+        return io.BytesIO(data)
+
+    def close(self):
+        self.zip.close()
+        self.mmap.close()
+        self.file.close()
+
+class ArchivePool:
+    """
+    Open archives, most recently used last. Opening a member reuses the
+    handle instead of re-reading the central directory; handles of
+    archives that changed on disk are replaced. Handles still being read
+    are closed only once their last reader is done.
+    """
+
+    def __init__(self, max_handles=ARCHIVE_POOL_SIZE):
+        self.max_handles = max_handles
+        self.handles = OrderedDict()  # path -> ArchiveHandle
+        self.lock = threading.Lock()
+
+    def acquire(self, path):
+        st = os.stat(path)
+        with self.lock:
+            handle = self.handles.get(path)
+            if handle and handle.signature != (st.st_size, st.st_mtime_ns):
+                self._retire(self.handles.pop(path))
+                handle = None
+            if handle is None:
+                handle = ArchiveHandle(path)
+                self.handles[path] = handle
+            self.handles.move_to_end(path)
+            handle.users += 1
+            while len(self.handles) > self.max_handles:
+                self._retire(self.handles.popitem(last=False)[1])
+            return handle
+
+    def release(self, handle):
+        with self.lock:
+            handle.users -= 1
+            if handle.retired and handle.users == 0:
+                handle.close()
+
+    def _retire(self, handle):
+        handle.retired = True
+        if handle.users == 0:
+            handle.close()
+
+    def open_member(self, path, member):
+        """File object for one member; close it when done"""
+        handle = self.acquire(path)
+        try:
+            return handle.open_member(member, lambda: self.release(handle))
+        except Exception:
+            self.release(handle)
+            raise
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_archive_pool():
+    """The shared archive handle pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ArchivePool()
+        return _pool
+
+def prune_media_cache(keep, slot, max_bytes=ARCHIVE_MEDIA_CACHE_MB * 1024 * 1024):
+    """
+    Delete older copies of the same member, then the least recently used
+    extractions until the cache fits in max_bytes (keep always stays)
+    """
+    total = os.path.getsize(keep)
+    entries = []
+    for entry in os.scandir(ARCHIVE_MEDIA_CACHE_DIR):
+        if entry.path == keep or entry.name.endswith('.tmp') or not entry.is_file():
+            continue
+        try:
+            if entry.name.startswith(slot + '-'):
+                os.remove(entry.path)  # The archive changed since
+                continue
+            st = entry.stat()
+        except OSError:
+            continue  # Still open for playback (Windows) - next time
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def extract_member(path, member):
+    """
+    Real file for a member, for readers that need a path (OpenCV, ugoira,
+    animations). Extracted once into ARCHIVE_MEDIA_CACHE_DIR; a hit bumps
+    the file's mtime, which is what pruning goes by.
+    """
+    st = os.stat(path)
+    # slot: this member of this archive; the suffix: the archive's version
+    slot = hashlib.sha1(f"{os.path.abspath(path)}|{member}".encode('utf-8')).hexdigest()
+    version = hashlib.sha1(f"{st.st_size}|{st.st_mtime_ns}".encode('utf-8')).hexdigest()[:12]
+    ext = os.path.splitext(member)[1]
+    target = os.path.join(ARCHIVE_MEDIA_CACHE_DIR, f"{slot}-{version}{ext}")
+    if os.path.exists(target):
+        try:
+            os.utime(target)
+        except OSError:
+            pass
+        return target
+
+    os.makedirs(ARCHIVE_MEDIA_CACHE_DIR, exist_ok=True)
+    tmp = f"{target}.{threading.get_ident()}.tmp"
+    with get_archive_pool().open_member(path, member) as src, open(tmp, 'wb') as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            dst.write(chunk)
+    os.replace(tmp, target)
+    prune_media_cache(target, slot)
+    return target
+
+def media_path(file_info):
+    """A real path for a library file (archive members are extracted)"""
+    if file_info.get('archive'):
+        return extract_member(file_info['archive'], file_info['member'])
+    return file_info['full_path']
+
+def media_stat(file_info):
+    """os.stat of what holds a file - the archive, for members"""
+    return os.stat(file_info.get('archive') or file_info['full_path'])
+
+@contextmanager
+def media_source(file_info):
+    """Something PIL can open: the path of a loose file, or a member's file object"""
+    if not file_info.get('archive'):
+        yield file_info['full_path']
+        return
+    with get_archive_pool().open_member(file_info['archive'], file_info['member']) as f:
+        yield f
@@ -1,52 +1,278 @@
+import atexit
 import json
 import os
-from config import POINTS_FILE, NICE_FILE
+import re
+import threading
+import time
+from config import *
+
+# 1 = image-based keys may exist, 2 = migrated to post-based
+SCHEMA_VERSION = 2
+
+def extract_post_id(filename):
+    """
+    Extract post ID from filename
+    FIX #3: Handle multiple formats:
+    - Standard: 12345678_p0-title-artist-12345.ext -> 12345678
+    - Old: user}-12345678_3.jpg -> 12345678
+    - Already migrated: 12345678 -> 12345678
+    """
+    # If it's already just digits, it's already migrated
+    if filename.isdigit():
+        return filename
+    
+    # Remove file extension if present
+    base_name = filename.split('.')[0]
+    
+    # Pattern 1: Standard format with _p (12345678_p0...)
+    if '_p' in base_name:
+        match = re.match(r'^(\d+)_p', base_name)
+        if match:
+            return match.group(1)
+    
+    # Pattern 2: Old format (user}-12345678_3 or user}-12345678)
+    if base_name.startswith('user}-'):
+        # Remove the "user}-" prefix
+        after_prefix = base_name[6:]  # Skip "user}-"
+        # Extract leading digits
+        match = re.match(r'^(\d+)', after_prefix)
+        if match:
+            return match.group(1)
+    
+    # Pattern 3: Any filename with leading digits
+    match = re.match(r'^(\d+)', base_name)
+    if match:
+        return match.group(1)
+    
+    # Can't extract post ID
+    return None
+
+def find_image_based_ratings(points_items, nice_items):
+    """
+    Collect ratings stored under old image-based keys, grouped by post.
+    Points are summed per post, nice takes the maximum.
+    """
+    old_points = {}
+    old_nice = {}
+    
+    # FIX #3: Handle both old format (user}-12345_3.jpg) and standard format (12345_p0.jpg)
+    for filename, value in points_items:
+        post_id = extract_post_id(filename)
+        if post_id and post_id != filename:  # If we extracted a different ID, it's old format
+            if post_id not in old_points:
+                old_points[post_id] = 0
+            old_points[post_id] += value
+    
+    for filename, value in nice_items:
+        post_id = extract_post_id(filename)
+        if post_id and post_id != filename:  # If we extracted a different ID, it's old format
+            if post_id not in old_nice:
+                old_nice[post_id] = 0
+            # Take maximum nice value for post
+            if value > old_nice.get(post_id, 0):
+                old_nice[post_id] = value
+    
+    return old_points, old_nice
 
 class Database:
+    """
+    Points/nice storage.
+    
+    points.json and nice.json are snapshots. Changes are applied in memory
+    and queued; a background thread appends them to a journal and fsyncs it
+    every JOURNAL_FSYNC_INTERVAL seconds, and periodically compacts the
+    journal into the snapshots. Clicks never wait on the disk.
+    Snapshots are replaced atomically. On startup the journal is replayed
+    on top of the snapshots.
+    """
+    
     def __init__(self):
         self.points_db = self._load(POINTS_FILE)
         self.nice_db = self._load(NICE_FILE)
         
+        self.lock = threading.Lock()
+        # Held from moving the journal aside until its .compacting copy is gone
+        self.compact_lock = threading.Lock()
+        self.journal_entries = self._replay_journal()
+        self.journal = open(JOURNAL_FILE, 'a', encoding='utf-8')
+        self.pending = {}  # (kind, post_id) -> new value, waiting for the flusher
+        self.closed = False
+        self.stopping = threading.Event()
+        self.listeners = []
+        
         # Migrate from image-based to post-based
         self.migrate_to_post_based()
+        
+        # Write-behind flushing + compaction
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+        
+        # Don't lose the last clicks if the app exits without close()
+        atexit.register(self.close)
     
     def _load(self, filename):
-        if os.path.exists(filename):
+        """
+        Load a JSON snapshot. A broken file is reported and kept aside,
+        and the previous snapshot (.bak) is used instead.
+        """
+        for path in (filename, filename + '.bak'):
+            if not os.path.exists(path):
+                continue
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if path != filename:
+                    print(f"Recovered {filename} from {path}")
+                return data
+            except (OSError, ValueError) as e:
+                print(f"ERROR: {path} is unreadable ({e})")
+                broken = f"{path}.broken-{int(time.time())}"
+                try:
+                    os.replace(path, broken)
+                    print(f"Kept the broken file as {broken}")
+                except OSError:
+                    pass
         return {}
     
     def _save(self, data, filename):
-        with open(filename, 'w', encoding='utf-8') as f:
+        """Write a snapshot atomically; the previous one is kept as .bak"""
+        tmp = filename + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if os.path.exists(filename):
+            os.replace(filename, filename + '.bak')
+        os.replace(tmp, filename)
     
-    def migrate_to_post_based(self):
-        """Migrate from image-based to post-based storage"""
-        print("Checking for database migration...")
+    def _replay_journal(self):
+        """Apply journal entries on top of the snapshots, returns entry count"""
+        count = 0
+        
+        # A compaction interrupted by a crash leaves its journal behind
+        for filename in (JOURNAL_FILE + '.compacting', JOURNAL_FILE):
+            if not os.path.exists(filename):
+                continue
+            
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        kind, post_id, value = json.loads(line)
+                    except ValueError:
+                        # Torn last line from a crash mid-append
+                        print(f"Ignoring incomplete journal entry in {filename}")
+                        break
+                    self._apply(kind, post_id, value)
+                    count += 1
         
-        # Check if we have old image-based data
-        old_points = {}
-        old_nice = {}
+        if count:
+            print(f"Replayed {count} journal entries")
+        return count
+    
+    def _apply(self, kind, post_id, value):
+        """Apply one journal entry. Entries hold the new value, so replay is idempotent."""
+        if kind == 'points':
+            self.points_db[post_id] = value
+        elif kind == 'nice':
+            self.nice_db[post_id] = value
+        elif kind == 'remove':
+            self.points_db.pop(post_id, None)
+            self.nice_db.pop(post_id, None)
+    
+    def _queue(self, kind, post_id, value):
+        """Queue one change for the flusher (caller holds the lock)"""
+        if kind == 'remove':
+            # Earlier changes to this post are superseded by the removal
+            self.pending.pop(('points', post_id), None)
+            self.pending.pop(('nice', post_id), None)
+        # Re-insert so the dict keeps the order changes happened in
+        self.pending.pop((kind, post_id), None)
+        self.pending[(kind, post_id)] = value
+    
+    def _write_pending(self):
+        """Append queued changes to the journal and fsync it (caller holds the lock)"""
+        if not self.pending:
+            return
         
-        # FIX #3: Handle both old format (user}-12345_3.jpg) and standard format (12345_p0.jpg)
-        for filename, value in self.points_db.items():
-            post_id = self._extract_post_id(filename)
-            if post_id and post_id != filename:  # If we extracted a different ID, it's old format
-                if post_id not in old_points:
-                    old_points[post_id] = 0
-                old_points[post_id] += value
+        self.journal.write(''.join(
+            json.dumps([kind, post_id, value], ensure_ascii=False) + '\n'
+            for (kind, post_id), value in self.pending.items()
+        ))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.journal_entries += len(self.pending)
+        self.pending = {}
+    
+    def _flush_loop(self):
+        """Background thread: write-behind flushing and periodic compaction"""
+        while not self.stopping.wait(JOURNAL_FSYNC_INTERVAL):
+            try:
+                self.flush()
+                if self.journal_entries >= JOURNAL_COMPACT_ENTRIES:
+                    self.compact()
+            except OSError as e:
+                # Keep the changes queued and try again next round
+                print(f"Error saving ratings: {e}")
+    
+    def flush(self):
+        """Write queued changes to the journal now"""
+        with self.lock:
+            if not self.closed:
+                self._write_pending()
+    
+    def compact(self):
+        """Write the current state into the snapshots and start an empty journal"""
+        # One compaction at a time: another one would fold the fresh journal
+        # into .compacting while this one is still saving
+        with self.compact_lock:
+            with self.lock:
+                points = dict(self.points_db)
+                nice = dict(self.nice_db)
+                
+                # Move the journal aside; new clicks go to a fresh one meanwhile
+                self._write_pending()
+                self.journal.close()
+                if os.path.exists(JOURNAL_FILE + '.compacting'):
+                    # An earlier compaction failed to save - keep its entries too
+                    with open(JOURNAL_FILE, 'r', encoding='utf-8') as src, \
+                            open(JOURNAL_FILE + '.compacting', 'a', encoding='utf-8') as dst:
+                        dst.write(src.read())
+                    os.remove(JOURNAL_FILE)
+                else:
+                    os.replace(JOURNAL_FILE, JOURNAL_FILE + '.compacting')
+                self.journal = open(JOURNAL_FILE, 'a', encoding='utf-8')
+                self.journal_entries = 0
+            
+            self._save(points, POINTS_FILE)
+            self._save(nice, NICE_FILE)
+            os.remove(JOURNAL_FILE + '.compacting')
+    
+    def close(self):
+        """Stop the flusher and compact everything into the snapshots"""
+        if self.closed:
+            return
+        # The flusher may be mid-compaction - let it finish before the last one
+        self.stopping.set()
+        if self.flusher is not threading.current_thread():
+            self.flusher.join()
+        if self.journal_entries or self.pending:
+            self.compact()
+        with self.lock:
+            self.closed = True
+            self.journal.close()
+        atexit.unregister(self.close)
+    
+    def schema_version(self):
+        return self._load(DB_META_FILE).get('schema_version', 1)
+    
+    def migrate_to_post_based(self):
+        """Migrate from image-based to post-based storage (runs once)"""
+        if self.schema_version() >= SCHEMA_VERSION:
+            return
         
-        for filename, value in self.nice_db.items():
-            post_id = self._extract_post_id(filename)
-            if post_id and post_id != filename:  # If we extracted a different ID, it's old format
-                if post_id not in old_nice:
-                    old_nice[post_id] = 0
-                # Take maximum nice value for post
-                if value > old_nice.get(post_id, 0):
-                    old_nice[post_id] = value
+        print("Checking for database migration...")
+        old_points, old_nice = find_image_based_ratings(self.points_db.items(), self.nice_db.items())
         
         # If we found old data, migrate it
         if old_points or old_nice:
@@ -61,49 +287,18 @@ class Database:
                 self.nice_db[post_id] = max_nice
             
             # Save the migrated databases
-            self._save(self.points_db, POINTS_FILE)
-            self._save(self.nice_db, NICE_FILE)
+            self.compact()
             print("Migration complete!")
-    
-    def _extract_post_id(self, filename):
-        """
-        Extract post ID from filename
-        FIX #3: Handle multiple formats:
-        - Standard: 12345678_p0-title-artist-12345.ext -> 12345678
-        - Old: user}-12345678_3.jpg -> 12345678
-        - Already migrated: 12345678 -> 12345678
-        """
-        import re
-        
-        # If it's already just digits, it's already migrated
-        if filename.isdigit():
-            return filename
-        
-        # Remove file extension if present
-        base_name = filename.split('.')[0]
-        
-        # Pattern 1: Standard format with _p (12345678_p0...)
-        if '_p' in base_name:
-            match = re.match(r'^(\d+)_p', base_name)
-            if match:
-                return match.group(1)
-        
-        # Pattern 2: Old format (user}-12345678_3 or user}-12345678)
-        if base_name.startswith('user}-'):
-            # Remove the "user}-" prefix
-            after_prefix = base_name[6:]  # Skip "user}-"
-            # Extract leading digits
-            match = re.match(r'^(\d+)', after_prefix)
-            if match:
-                return match.group(1)
-        
-        # Pattern 3: Any filename with leading digits
-        match = re.match(r'^(\d+)', base_name)
-        if match:
-            return match.group(1)
         
-        # Can't extract post ID
-        return None
+        self._save({'schema_version': SCHEMA_VERSION}, DB_META_FILE)
+    
+    def add_listener(self, callback):
+        """Call callback(post_id) whenever a post's ratings change"""
+        self.listeners.append(callback)
+    
+    def _notify(self, post_id):
+        for callback in self.listeners:
+            callback(post_id)
     
     def get_points(self, post_id):
         """Get points for a post"""
@@ -113,17 +308,33 @@ class Database:
         """Get nice for a post"""
         return self.nice_db.get(post_id, 0)
     
+    def all_points(self):
+        """post_id -> points for every rated post"""
+        with self.lock:
+            return dict(self.points_db)
+    
+    def all_nice(self):
+        """post_id -> nice for every post with nice"""
+        with self.lock:
+            return dict(self.nice_db)
+    
     def add_point(self, post_id):
         """Add point to a post"""
-        self.points_db[post_id] = self.points_db.get(post_id, 0) + 1
-        self._save(self.points_db, POINTS_FILE)
-        return self.points_db[post_id]
+        with self.lock:
+            points = self.points_db.get(post_id, 0) + 1
+            self.points_db[post_id] = points
+            self._queue('points', post_id, points)
+        self._notify(post_id)
+        return points
     
     def add_nice(self, post_id):
         """Add nice to a post"""
-        self.nice_db[post_id] = self.nice_db.get(post_id, 0) + 1
-        self._save(self.nice_db, NICE_FILE)
-        return self.nice_db[post_id]
+        with self.lock:
+            nice = self.nice_db.get(post_id, 0) + 1
+            self.nice_db[post_id] = nice
+            self._queue('nice', post_id, nice)
+        self._notify(post_id)
+        return nice
     
     def remove_file(self, filename):
         """Remove file from both databases (for compatibility)"""
@@ -133,10 +344,17 @@ class Database:
     
     def remove_post(self, post_id):
         """Remove post from databases"""
-        if post_id in self.points_db:
-            del self.points_db[post_id]
-            self._save(self.points_db, POINTS_FILE)
-        
-        if post_id in self.nice_db:
-            del self.nice_db[post_id]
-            self._save(self.nice_db, NICE_FILE)
+        with self.lock:
+            if post_id not in self.points_db and post_id not in self.nice_db:
+                return
+            self.points_db.pop(post_id, None)
+            self.nice_db.pop(post_id, None)
+            self._queue('remove', post_id, 0)
+        self._notify(post_id)
+
+def open_database():
+    """Open the configured storage engine (both have the same API)"""
+    if DATABASE_BACKEND == 'sqlite':
+        from core.sqlite_store import SqliteDatabase
+        return SqliteDatabase()
+    return Database()
@@ -1,15 +1,53 @@
 import os
 import re
+import time
+import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from config import *
+from core.archive import list_archive
 
-def parse_filename(filename):
+# Pixiv ugoira downloads: 12345678_ugoira0-title-artist-12345.zip, 12345678_ugoira1920x1080.zip
+UGOIRA_NAME_PATTERN = re.compile(r'^(\d+)_ugoira[^-]*')
+
+def is_ugoira_filename(filename):
+    """Check if a file is a ugoira zip"""
+    name, ext = os.path.splitext(filename)
+    return ext.lower() in SUPPORTED_UGOIRA_EXTS and UGOIRA_NAME_PATTERN.match(name) is not None
+
+# Ugoira frame delays saved next to the zip
+UGOIRA_SIDECAR_EXTS = ('.json', '.ugoira')
+
+def ugoira_sidecars(zip_path):
+    """Frame-delay files next to a ugoira zip (they move with it)"""
+    base = os.path.splitext(zip_path)[0]
+    return [base + ext for ext in UGOIRA_SIDECAR_EXTS if os.path.exists(base + ext)]
+
+def move_with_sidecars(src, dst, move=os.replace):
+    """Move a file into place with move(src, dst); a ugoira zip takes its frame-delay files along"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    sidecars = ugoira_sidecars(src) if is_ugoira_filename(os.path.basename(src)) else []
+    move(src, dst)
+    dst_base = os.path.splitext(dst)[0]
+    for sidecar in sidecars:
+        target = dst_base + os.path.splitext(sidecar)[1]
+        if os.path.exists(target):
+            print(f"Already exists, sidecar left behind: {target}")
+            continue
+        try:
+            move(sidecar, target)
+        except OSError as e:
+            print(f"Error moving {sidecar}: {e}")
+
+def parse_filename(filename, root=FIXED_FOLDER_PATH):
     """
     SUPER FLEXIBLE filename parser that handles:
     1. Standard: 12345678_p0-title-artist-12345.ext
     2. Variations: 12345678_p0-title-artist.ext
     3. Minimal: 12345678_p0.ext
     4. Video format: 12345678-title-artist-12345.ext (no _p0)
+    5. Ugoira: 12345678_ugoira0-title-artist-12345.zip (parsed like _p0)
+    root is the library folder the file lives in.
     """
     name, ext = os.path.splitext(filename)
     ext_lower = ext.lower()
@@ -17,6 +55,11 @@ def parse_filename(filename):
     # Check if it's a video FIRST
     is_video = any(ext_lower == video_ext.lower() for video_ext in SUPPORTED_VIDEO_EXTS)
     
+    # Ugoira zips are single-page animated posts - parse them like page 0
+    is_ugoira = is_ugoira_filename(filename)
+    if is_ugoira:
+        name = UGOIRA_NAME_PATTERN.sub(r'\1_p0', name)
+    
     # Try multiple patterns in order of specificity
     patterns = [
         # Standard full pattern with _p
@@ -53,8 +96,10 @@ def parse_filename(filename):
                     'artist': groups[3],
                     'artist_id': groups[4],
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 1:  # Video: 123-title-artist-12345
                 return {
@@ -64,8 +109,10 @@ def parse_filename(filename):
                     'artist': groups[2],
                     'artist_id': groups[3],
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 2:  # 123_p0-title-artist
                 return {
@@ -75,8 +122,10 @@ def parse_filename(filename):
                     'artist': groups[3],
                     'artist_id': groups[3],
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 3:  # Video: 123-title-artist
                 return {
@@ -86,8 +135,10 @@ def parse_filename(filename):
                     'artist': groups[2],
                     'artist_id': groups[2],
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 4:  # 123_p0-title
                 return {
@@ -97,8 +148,10 @@ def parse_filename(filename):
                     'artist': 'Unknown',
                     'artist_id': 'unknown',
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 5:  # Video: 123-title
                 return {
@@ -108,8 +161,10 @@ def parse_filename(filename):
                     'artist': 'Unknown',
                     'artist_id': 'unknown',
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 6:  # 123_p0
                 return {
@@ -119,8 +174,10 @@ def parse_filename(filename):
                     'artist': 'Unknown',
                     'artist_id': 'unknown',
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 7:  # 123_p (incomplete)
                 return {
@@ -130,8 +187,10 @@ def parse_filename(filename):
                     'artist': 'Unknown',
                     'artist_id': 'unknown',
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
             elif pattern_idx == 8:  # Just numbers
                 return {
@@ -141,8 +200,10 @@ def parse_filename(filename):
                     'artist': 'Unknown',
                     'artist_id': 'unknown',
                     'filename': filename,
-                    'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-                    'is_video': is_video
+                    'full_path': os.path.join(root, filename),
+                    'root': root,
+                    'is_video': is_video,
+                    'is_ugoira': is_ugoira
                 }
     
     # If no pattern matches at all, create minimal entry
@@ -155,65 +216,129 @@ def parse_filename(filename):
         'artist': 'Unknown',
         'artist_id': 'unknown',
         'filename': filename,
-        'full_path': os.path.join(FIXED_FOLDER_PATH, filename),
-        'is_video': is_video
+        'full_path': os.path.join(root, filename),
+        'root': root,
+        'is_video': is_video,
+        'is_ugoira': is_ugoira
     }
 
+MEDIA_EXTS = tuple(ext.lower() for ext in SUPPORTED_IMAGE_EXTS + SUPPORTED_VIDEO_EXTS)
+
+def is_media_filename(filename):
+    """Image, video or ugoira - anything the library loads"""
+    return filename.lower().endswith(MEDIA_EXTS) or is_ugoira_filename(filename)
+
+def is_archive_filename(filename):
+    """Archived posts (zip/cbz) - ugoira zips are media of their own"""
+    return filename.lower().endswith(ARCHIVE_EXTS) and not is_ugoira_filename(filename)
+
+def same_path(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+def shard_folder(post_id):
+    """Shard subfolder of a post: its last SHARD_DIGITS digits"""
+    return post_id[-SHARD_DIGITS:].rjust(SHARD_DIGITS, '0')
+
+def library_path(root_path, filename, layout):
+    """Where a file belongs in a root with the given layout"""
+    if layout == 'sharded':
+        parsed = parse_filename(filename, root_path)
+        return os.path.join(root_path, shard_folder(parsed['post_id']), filename)
+    return os.path.join(root_path, filename)
+
+def scan_tree(path, skip=(), folders=None):
+    """
+    Yield the DirEntry of every file below path.
+
+    DirEntry carries the file type from the directory listing, so
+    nothing is stat'ed separately. Folders in skip (normcase'd absolute
+    paths, e.g. other library roots) and symlinked folders are not entered.
+    Every folder walked is appended to folders, if given.
+    """
+    stack = [path]
+    while stack:
+        folder = stack.pop()
+        if folders is not None:
+            folders.append(folder)
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            yield entry
+                        elif entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(os.path.abspath(entry.path)) not in skip:
+                                stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Cannot read {folder}: {e}")
+
 class FileManager:
-    def __init__(self):
+    def __init__(self, library_roots=LIBRARY_ROOTS):
+        # One index per root, merged into the views below
+        self.roots = [{'path': r['path'], 'read_only': r.get('read_only', False),
+                       'layout': r.get('layout', LIBRARY_LAYOUT), 'files': [],
+                       'folders': [], 'scanned_at': 0.0}
+                      for r in library_roots]
+        self.by_filename = {}
         self.all_files = []
         self.all_posts = defaultdict(list)
         self.all_artists = defaultdict(list)
         self.video_posts = []
+        self.post_ids = []  # Cached keys of all_posts for random picks
         self.load_files()
     
     def load_files(self):
-        """Load and parse all files from the folder"""
+        """Scan all library roots in parallel and merge them into one view"""
         self.all_files.clear()
         self.video_posts.clear()
+        self.by_filename.clear()
         
-        print(f"Loading files from: {FIXED_FOLDER_PATH}")
+        print(f"Loading files from {len(self.roots)} library roots")
+        start = time.time()
         
-        if not os.path.exists(FIXED_FOLDER_PATH):
-            print(f"ERROR: Folder does not exist: {FIXED_FOLDER_PATH}")
-            return
+        # One thread per root - total time is the slowest drive, not the sum
+        with ThreadPoolExecutor(max_workers=max(1, len(self.roots))) as pool:
+            scans = list(pool.map(self.scan_root, self.roots))
         
-        files = os.listdir(FIXED_FOLDER_PATH)
-        print(f"Found {len(files)} items in folder")
+        failed_parse = 0
+        for root, (files, failed, seconds) in zip(self.roots, scans):
+            root['files'] = files
+            failed_parse += failed
+            flag = " (read-only)" if root['read_only'] else ""
+            print(f"  {root['path']}: {len(files)} files in {seconds:.2f}s{flag}")
         
         video_count = 0
         image_count = 0
-        failed_parse = 0
+        duplicates = 0
+        video_seen = set()
         
-        for f in files:
-            f_lower = f.lower()
-            full_path = os.path.join(FIXED_FOLDER_PATH, f)
-            
-            if os.path.isfile(full_path):
-                # Check file type
-                is_image = any(f_lower.endswith(ext.lower()) for ext in SUPPORTED_IMAGE_EXTS)
-                is_video = any(f_lower.endswith(ext.lower()) for ext in SUPPORTED_VIDEO_EXTS)
+        # Earlier roots win when the same file exists in several
+        for root in self.roots:
+            for parsed in root['files']:
+                if parsed['filename'] in self.by_filename:
+                    duplicates += 1
+                    continue
                 
-                if is_image or is_video:
-                    parsed = parse_filename(f)
-                    if parsed:
-                        self.all_files.append(parsed)
-                        
-                        if parsed['is_video']:
-                            video_count += 1
-                            if parsed['post_id'] not in self.video_posts:
-                                self.video_posts.append(parsed['post_id'])
-                        else:
-                            image_count += 1
-                    else:
-                        failed_parse += 1
-                        print(f"FAILED TO PARSE: {f}")
+                self.by_filename[parsed['filename']] = parsed
+                self.all_files.append(parsed)
+                
+                if parsed['is_video']:
+                    video_count += 1
+                    if parsed['post_id'] not in video_seen:
+                        video_seen.add(parsed['post_id'])
+                        self.video_posts.append(parsed['post_id'])
+                else:
+                    image_count += 1
         
         print(f"\n=== LOADING SUMMARY ===")
-        print(f"Total files loaded: {len(self.all_files)}")
+        print(f"Total files loaded: {len(self.all_files)} in {time.time() - start:.2f}s")
         print(f"  Videos: {video_count} files, {len(self.video_posts)} posts")
         print(f"  Images: {image_count} files")
         print(f"  Failed to parse: {failed_parse} files")
+        if duplicates:
+            print(f"  Duplicates in later roots ignored: {duplicates} files")
         
         if self.video_posts:
             print(f"\nFirst 10 video post IDs:")
@@ -222,6 +347,77 @@ class FileManager:
         
         self.group_files()
     
+    def scan_root(self, root):
+        """Parse the media files of one root, returns (files, failed, seconds)"""
+        start = time.time()
+        path = root['path']
+        files = []
+        failed_parse = 0
+        # For the watcher: what was listed, and when
+        root['folders'] = []
+        root['scanned_at'] = start
+        
+        if not os.path.exists(path):
+            print(f"ERROR: Folder does not exist: {path}")
+            return files, failed_parse, 0.0
+        
+        skip = self.other_roots(root)
+        
+        # Flat and sharded roots alike - the parser only needs the name
+        for entry in scan_tree(path, skip, root['folders']):
+            f = entry.name
+            if is_media_filename(f):
+                parsed = parse_filename(f, path)
+                if parsed:
+                    parsed['full_path'] = entry.path
+                    files.append(parsed)
+                else:
+                    failed_parse += 1
+                    print(f"FAILED TO PARSE: {f}")
+            elif is_archive_filename(f):
+                members, failed = self.scan_archive(entry.path, path)
+                files.extend(members)
+                failed_parse += failed
+        
+        return files, failed_parse, time.time() - start
+    
+    def scan_archive(self, archive_path, root_path):
+        """Parse the members of an archive like the files of a folder"""
+        try:
+            names = list_archive(archive_path)
+        except Exception as e:
+            print(f"Cannot read archive {archive_path}: {e}")
+            return [], 0
+        
+        files = []
+        failed_parse = 0
+        for member in names:
+            f = member.rsplit('/', 1)[-1]
+            if not is_media_filename(f):
+                continue
+            parsed = parse_filename(f, root_path)
+            if parsed:
+                parsed['full_path'] = os.path.join(archive_path, *member.split('/'))
+                parsed['archive'] = archive_path
+                parsed['member'] = member
+                files.append(parsed)
+            else:
+                failed_parse += 1
+                print(f"FAILED TO PARSE: {archive_path}: {member}")
+        return files, failed_parse
+    
+    def other_roots(self, root):
+        """Roots nested in this one are scanned on their own (sfw/Junko in the main folder)"""
+        return {os.path.normcase(os.path.abspath(other['path']))
+                for other in self.roots if other is not root}
+    
+    def get_root(self, path):
+        """Root entry for a root path"""
+        for root in self.roots:
+            if same_path(root['path'], path):
+                return root
+        return None
+    
     def group_files(self):
         """Group files by post ID and artist"""
         self.all_posts.clear()
@@ -233,16 +429,11 @@ class FileManager:
         for post_id in self.all_posts:
             self.all_posts[post_id].sort(key=lambda x: x['page'])
         
+        self.post_ids = list(self.all_posts.keys())
+        
         for post_id, files in self.all_posts.items():
             if files:
-                artist_info = {
-                    'artist': files[0]['artist'],
-                    'artist_id': files[0]['artist_id'],
-                    'post_id': post_id,
-                    'thumbnail': files[0],
-                    'page_count': len(files)
-                }
-                self.all_artists[files[0]['artist_id']].append(artist_info)
+                self.all_artists[files[0]['artist_id']].append(self.artist_entry(post_id, files))
         
         print(f"\nGrouped into {len(self.all_posts)} posts, {len(self.all_artists)} artists")
         
@@ -254,6 +445,90 @@ class FileManager:
         
         print(f"Posts containing videos: {video_post_count}")
     
+    def artist_entry(self, post_id, files):
+        return {
+            'artist': files[0]['artist'],
+            'artist_id': files[0]['artist_id'],
+            'post_id': post_id,
+            'thumbnail': files[0],
+            'page_count': len(files)
+        }
+    
+    def add_file(self, full_path, root_path):
+        """
+        A file appeared on disk (watcher). Updates the grouped views for its
+        post only. Returns the post ID, or None if the file is already known.
+        """
+        filename = os.path.basename(full_path)
+        if filename in self.by_filename or not is_media_filename(filename):
+            return None
+        
+        parsed = parse_filename(filename, root_path)
+        parsed['full_path'] = full_path
+        post_id = parsed['post_id']
+        
+        self.index_file(parsed)
+        
+        if post_id not in self.all_posts:
+            self.post_ids.append(post_id)
+        self.all_posts[post_id].append(parsed)
+        if parsed['is_video'] and post_id not in self.video_posts:
+            self.video_posts.append(post_id)
+        
+        self.refresh_post(post_id, [parsed['artist_id']])
+        return post_id
+    
+    def remove_path(self, full_path):
+        """
+        A file disappeared from disk (watcher). Returns the post ID, or None
+        if the file wasn't in the library (e.g. the app moved it itself).
+        """
+        file_info = self.by_filename.get(os.path.basename(full_path))
+        if not file_info or not same_path(file_info['full_path'], full_path):
+            return None
+        
+        post_id = file_info['post_id']
+        self.unindex_file(file_info)
+        
+        files = self.all_posts[post_id]
+        files.remove(file_info)
+        if not files:
+            del self.all_posts[post_id]
+            self.post_ids.remove(post_id)
+        if post_id in self.video_posts and not any(f['is_video'] for f in files):
+            self.video_posts.remove(post_id)
+        
+        self.refresh_post(post_id, [file_info['artist_id']])
+        return post_id
+    
+    def index_file(self, file_info):
+        self.by_filename[file_info['filename']] = file_info
+        self.all_files.append(file_info)
+        root = self.get_root(file_info['root'])
+        if root:
+            root['files'].append(file_info)
+    
+    def unindex_file(self, file_info):
+        del self.by_filename[file_info['filename']]
+        self.all_files.remove(file_info)
+        root = self.get_root(file_info['root'])
+        if root:
+            root['files'].remove(file_info)
+    
+    def refresh_post(self, post_id, artist_ids):
+        """Re-sort a post's pages and rebuild its artist entry after files came or went"""
+        files = self.all_posts.get(post_id, [])
+        files.sort(key=lambda x: x['page'])
+        
+        for artist_id in set(artist_ids + ([files[0]['artist_id']] if files else [])):
+            works = [w for w in self.all_artists.get(artist_id, []) if w['post_id'] != post_id]
+            if files and files[0]['artist_id'] == artist_id:
+                works.append(self.artist_entry(post_id, files))
+            if works:
+                self.all_artists[artist_id] = works
+            else:
+                self.all_artists.pop(artist_id, None)
+    
     def get_video_posts(self):
         """Get all posts that contain videos"""
         print(f"\nDEBUG: Video posts found: {len(self.video_posts)}")
@@ -263,29 +538,62 @@ class FileManager:
     
     def delete_file(self, filename):
         """Delete a file and update groups"""
-        path = os.path.join(FIXED_FOLDER_PATH, filename)
-        if os.path.exists(path):
-            os.remove(path)
-            
-            self.all_files = [f for f in self.all_files if f['filename'] != filename]
-            self.group_files()
-            return True
-        return False
+        file_info = self.by_filename.get(filename)
+        if file_info and file_info.get('archive'):
+            print(f"Not deleting {filename}: it is inside {file_info['archive']}")
+            return False
+        if not file_info or not os.path.exists(file_info['full_path']):
+            return False
+        
+        root = self.get_root(file_info['root'])
+        if root and root['read_only']:
+            print(f"Not deleting {filename}: {root['path']} is read-only")
+            return False
+        
+        os.remove(file_info['full_path'])
+        
+        self.unindex_file(file_info)
+        self.group_files()
+        return True
     
     def move_file(self, filename, target_folder):
         """Move file to target folder (SFW/Junko)"""
-        src = os.path.join(FIXED_FOLDER_PATH, filename)
-        dst = os.path.join(FIXED_FOLDER_PATH, target_folder, filename)
+        file_info = self.by_filename.get(filename)
+        if not file_info:
+            return False
+        if file_info.get('archive'):
+            print(f"Not moving {filename}: it is inside {file_info['archive']}")
+            return False
+        
+        root = self.get_root(file_info['root'])
+        if root and root['read_only']:
+            print(f"Not moving {filename}: {root['path']} is read-only")
+            return False
+        
+        target_dir = os.path.join(FIXED_FOLDER_PATH, target_folder)
+        if same_path(file_info['root'], target_dir):
+            return False
+        
+        target_root = self.get_root(target_dir)
+        layout = target_root['layout'] if target_root else LIBRARY_LAYOUT
+        dst = library_path(target_dir, filename, layout)
         
         try:
-            import shutil
-            shutil.move(src, dst)
-            
-            self.all_files = [f for f in self.all_files if f['filename'] != filename]
-            self.group_files()
-            return True
-        except:
+            move_with_sidecars(file_info['full_path'], dst, shutil.move)
+        except OSError as e:
+            print(f"Error moving {filename}: {e}")
             return False
+        
+        self.unindex_file(file_info)
+        
+        # Still part of the library if the target folder is one of the roots
+        if target_root:
+            moved = parse_filename(filename, target_root['path'])
+            moved['full_path'] = dst
+            self.index_file(moved)
+        
+        self.group_files()
+        return True
     
     def get_artist_works(self, artist_id):
         """Get all works by an artist"""
@@ -306,4 +614,4 @@ class FileManager:
             print(f"DEBUG: Getting random video from {len(self.video_posts)} options")
             return random.choice(self.video_posts)
         else:
-            return random.choice(list(self.all_posts.keys()))
+            return random.choice(self.post_ids)
@@ -0,0 +1,200 @@
+import os
+import time
+import queue
+import shutil
+import threading
+from config import *
+from core.file_manager import scan_tree, parse_filename, library_path, is_media_filename, move_with_sidecars
+from core.thumbnail_cache import ThumbnailCache
+from core.video_proxy import probe_video, needs_proxy
+from core.scheduler import get_scheduler, PRIORITY_BACKGROUND
+
+class IngestPipeline:
+    """
+    Moves a downloader's staging folder into the library:
+
+        parse -> move -> warm (thumbnail, video probe) -> ready
+
+    Every file goes through the stages on its own, as background tasks on
+    the shared scheduler, so parsing, moving and thumbnailing of different
+    files overlap. Moves are renames when staging and library share a
+    drive, otherwise copies (to a .part file, renamed when complete).
+    A file is queued as ('add', root path, path) for drain() only once its
+    caches are warm. Files already in the library stay in staging.
+
+    Files modified in the last INGEST_SETTLE_SECONDS are left for the next
+    run; in the background, a file also has to look the same (size, mtime)
+    as on the previous scan, so downloads still being written aren't moved.
+    """
+
+    def __init__(self, staging=INGEST_STAGING_FOLDER, root=None, thumbnail_cache=None):
+        root = root or LIBRARY_ROOTS[0]
+        self.staging = staging
+        self.root_path = root['path']
+        self.layout = root.get('layout', LIBRARY_LAYOUT)
+        self.thumbnail_cache = thumbnail_cache or ThumbnailCache()
+        self.scheduler = get_scheduler()
+
+        self.events = queue.Queue()
+        self.cond = threading.Condition()
+        self.outstanding = 0
+        self.counts = {}
+        self.heavy_videos = []  # Need a proxy (build_proxies.py)
+        self.seen = {}  # path -> (size, mtime) at the previous scan
+        self.stopped = threading.Event()
+
+    def same_device(self):
+        try:
+            return os.stat(self.staging).st_dev == os.stat(self.root_path).st_dev
+        except OSError:
+            return False
+
+    def settled(self, entry, seen, now, wait_stable):
+        """Whether a staged file is done being written"""
+        try:
+            st = entry.stat()
+        except OSError:
+            return False  # Gone meanwhile
+        signature = (st.st_size, st.st_mtime_ns)
+        seen[entry.path] = signature
+        if now - st.st_mtime < INGEST_SETTLE_SECONDS:
+            return False
+        return not wait_stable or self.seen.get(entry.path) == signature
+
+    def run(self, known=(), wait_stable=False):
+        """
+        Ingest everything in the staging folder; known = filenames already in
+        the library. wait_stable: only files unchanged since the previous run.
+        """
+        if not self.staging or not os.path.isdir(self.staging):
+            print(f"ERROR: Staging folder does not exist: {self.staging}")
+            return 0
+
+        start = time.time()
+        self.counts = {'moved': 0, 'copied': 0, 'skipped': 0, 'failed': 0}
+        self.heavy_videos = []
+        rename = self.same_device()
+
+        found = 0
+        waiting = 0
+        seen = {}
+        now = time.time()
+        for entry in scan_tree(self.staging):
+            if not is_media_filename(entry.name):
+                continue
+            if not self.settled(entry, seen, now, wait_stable):
+                waiting += 1
+                continue
+            if entry.name in known:
+                self._count('skipped')
+                continue
+            file_info = parse_filename(entry.name, self.root_path)
+            if not file_info:
+                print(f"FAILED TO PARSE: {entry.name}")
+                self._count('failed')
+                continue
+
+            found += 1
+            with self.cond:
+                self.outstanding += 1
+            self.scheduler.submit(self.move, entry.path, file_info, rename,
+                                  priority=PRIORITY_BACKGROUND, path=entry.path)
+
+        # Parsing ran ahead of the moves - wait for the tail of the pipeline
+        with self.cond:
+            while self.outstanding:
+                self.cond.wait()
+        self.seen = seen
+
+        if waiting and not wait_stable:
+            print(f"{waiting} files were modified in the last {INGEST_SETTLE_SECONDS}s - left for the next run")
+
+        if found or self.counts['skipped'] or self.counts['failed']:
+            self.report(time.time() - start)
+        return self.counts['moved'] + self.counts['copied']
+
+    def move(self, src, file_info, rename):
+        """Stage 2: into the library, at the place its layout puts it"""
+        dst = library_path(self.root_path, file_info['filename'], self.layout)
+        try:
+            if os.path.exists(dst):
+                print(f"Already in the library, left in staging: {file_info['filename']}")
+                self._finish('skipped')
+                return
+
+            # Ugoira frame-delay sidecars travel with their zip
+            move_with_sidecars(src, dst, os.replace if rename else self.copy)
+        except OSError as e:
+            print(f"Error moving {file_info['filename']}: {e}")
+            self._finish('failed')
+            return
+
+        file_info['full_path'] = dst
+        self.scheduler.submit(self.warm, file_info, 'moved' if rename else 'copied',
+                              priority=PRIORITY_BACKGROUND, path=dst)
+
+    def copy(self, src, dst):
+        """Move across drives - the library (and its watcher) never sees a half-copied file"""
+        part = dst + '.part'
+        shutil.copy2(src, part)
+        os.replace(part, dst)
+        os.remove(src)
+
+    def warm(self, file_info, result):
+        """Stage 3: thumbnail into the pack, probe videos for proxies"""
+        try:
+            self.thumbnail_cache.get(file_info)
+        except Exception as e:
+            print(f"Thumbnail failed for {file_info['filename']}: {e}")
+
+        if file_info['is_video']:
+            info = probe_video(file_info['full_path'])
+            if info and needs_proxy(file_info['full_path'], info):
+                with self.cond:
+                    self.heavy_videos.append(file_info['full_path'])
+
+        self.events.put(('add', self.root_path, file_info['full_path']))
+        self._finish(result)
+
+    def _count(self, result):
+        with self.cond:
+            self.counts[result] += 1
+
+    def _finish(self, result):
+        with self.cond:
+            self.counts[result] += 1
+            self.outstanding -= 1
+            self.cond.notify_all()
+
+    def drain(self, limit=WATCH_BATCH):
+        """Ingested files ready to browse, oldest first (at most limit per call)"""
+        events = []
+        try:
+            while len(events) < limit:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def report(self, seconds):
+        done = self.counts['moved'] + self.counts['copied']
+        rate = done / seconds if seconds else 0
+        print(f"\n=== INGEST SUMMARY ===")
+        print(f"{self.staging} -> {self.root_path} in {seconds:.1f}s ({rate:.0f} files/s)")
+        print(f"  Moved: {self.counts['moved']}, copied: {self.counts['copied']}")
+        print(f"  Skipped: {self.counts['skipped']}, failed: {self.counts['failed']}")
+        if self.heavy_videos:
+            print(f"  {len(self.heavy_videos)} heavy videos need a proxy")
+
+    def start_background(self, file_manager, interval=INGEST_INTERVAL_SECONDS):
+        """Ingest whatever lands in the staging folder every interval seconds"""
+        def loop():
+            while not self.stopped.wait(interval):
+                try:
+                    self.run(file_manager.by_filename, wait_stable=True)
+                except Exception as e:
+                    print(f"Ingest failed: {e}")
+        threading.Thread(target=loop, name='ingest', daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,79 @@
+import cv2
+from PIL import Image
+from config import *
+from core.video_proxy import get_proxy_path
+from core.ugoira import UgoiraSource
+from core.animation import AnimatedImageSource
+from core.archive import media_path, media_source
+
+def decode_media(file_info):
+    """
+    Open and decode what the viewer needs to show a file (runs off the Tk thread).
+
+    Returns a dict with 'kind' = 'image', 'animation' or 'video' and the
+    first 'image' to show. Raises on failure.
+    """
+    if file_info.get('is_ugoira'):
+        return open_animation(UgoiraSource(media_path(file_info)))
+
+    if file_info.get('is_video'):
+        path = media_path(file_info)
+        # Play the display-resolution proxy for heavy videos when one is cached
+        proxy_path = get_proxy_path(path)
+        if proxy_path:
+            if PRINT_VIDEO_INFO:
+                print(f"Using proxy for {file_info['filename']}: {proxy_path}")
+            try:
+                return read_video_poster(proxy_path)
+            except Exception as e:
+                print(f"Proxy unusable for {file_info['filename']}, using original: {e}")
+        return read_video_poster(path)
+
+    # Stills in archives are decoded straight from the archive
+    with media_source(file_info) as source:
+        img = Image.open(source)
+
+        # Animated GIF/WebP play through the frame scheduler
+        if getattr(img, 'is_animated', False) and getattr(img, 'n_frames', 1) > 1:
+            img.close()
+            return open_animation(AnimatedImageSource(media_path(file_info)))
+
+        return {'kind': 'image', 'image': img.convert('RGB')}
+
+def open_animation(source):
+    """Decode the first frame right away so the fit is correct"""
+    try:
+        if source.frame_count == 0:
+            raise ValueError("no frames")
+        first_frame = source.decode_frame(0)
+        source.buffer.put(0, first_frame)
+    except Exception:
+        source.close()
+        raise
+    return {'kind': 'animation', 'source': source, 'image': first_frame}
+
+def read_video_poster(path):
+    """First frame and metadata of a video"""
+    cap = cv2.VideoCapture(path)
+    try:
+        ret, frame = cap.read()
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    if not ret:
+        raise ValueError("cannot read first video frame")
+
+    return {
+        'kind': 'video',
+        'path': path,
+        'image': Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)),
+        'fps': fps,
+        'total_frames': total_frames
+    }
+
+def release_media(result):
+    """Free what decode_media opened for a result that won't be shown"""
+    if result and result['kind'] == 'animation':
+        result['source'].close()
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+from config import *
+from core.scheduler import get_scheduler, PRIORITY_PREFETCH
+from core.readahead import ReadAhead
+from core.media_loader import decode_media, release_media
+
+class Prefetcher:
+    """
+    Two stages ahead of the viewer, for the upcoming files (nearest first):
+    the next READAHEAD_FILES are read ahead into the OS cache, and the next
+    PREFETCH_DECODE are fully decoded and kept for load_media.
+    A new warm() supersedes the previous one.
+    """
+
+    def __init__(self, max_decoded=PREFETCH_DECODE + 1):
+        self.max_decoded = max_decoded
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.decoded = OrderedDict()  # full_path -> decode_media result
+        self.scheduler = get_scheduler()
+        self.readahead = ReadAhead()
+
+    def warm(self, file_infos):
+        """Read ahead and pre-decode upcoming files"""
+        file_infos = list(file_infos)
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+
+        # Archive members are read from the pooled, mmapped archive instead
+        self.readahead.warm([f['full_path'] for f in file_infos[:READAHEAD_FILES]
+                             if not f.get('archive')])
+
+        for file_info in file_infos[:PREFETCH_DECODE]:
+            if file_info['full_path'] not in self.decoded:
+                self.scheduler.submit(self.decode, file_info, generation,
+                                      priority=PRIORITY_PREFETCH, path=file_info['full_path'])
+
+    def decode(self, file_info, generation):
+        if generation != self.generation:
+            return  # Navigation moved on
+        try:
+            result = decode_media(file_info)
+        except Exception:
+            return  # Reported if the file is actually opened
+
+        # Animations own open files and decoder state - only keep still frames
+        if result['kind'] == 'animation':
+            release_media(result)
+            return
+
+        with self.lock:
+            self.decoded[file_info['full_path']] = result
+            while len(self.decoded) > self.max_decoded:
+                self.decoded.popitem(last=False)
+
+    def take(self, file_info):
+        """Pre-decoded result for a file, or None"""
+        with self.lock:
+            return self.decoded.pop(file_info['full_path'], None)
+
+    def forget(self, paths):
+        """Drop pre-decoded results of files that changed or went away"""
+        with self.lock:
+            for path in paths:
+                release_media(self.decoded.pop(path, None))
+
+    def report(self):
+        self.readahead.report()
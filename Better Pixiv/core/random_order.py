@@ -0,0 +1,119 @@
+import bisect
+import random
+from config import *
+
+class FeistelPermutation:
+    """
+    Seeded bijection over range(n).
+
+    A balanced Feistel network permutes the next power-of-4 domain; outputs
+    outside range(n) are fed back in (cycle walking) until they land inside.
+    The domain is less than 4n, so that takes a few rounds on average.
+    Both directions are O(1) and need no memory per element.
+    """
+
+    def __init__(self, n, seed, rounds=4):
+        self.n = n
+        self.half = max(1, ((n - 1).bit_length() + 1) // 2) if n > 1 else 1
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(rounds)]
+
+    def _round(self, x, key):
+        x = ((x ^ key) * 0x45d9f3b) & 0xffffffff
+        x ^= x >> 16
+        x = (x * 0x45d9f3b) & 0xffffffff
+        x ^= x >> 16
+        return x & self.mask
+
+    def _encrypt(self, x):
+        left, right = x >> self.half, x & self.mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half) | right
+
+    def _decrypt(self, x):
+        left, right = x >> self.half, x & self.mask
+        for key in reversed(self.keys):
+            left, right = right ^ self._round(left, key), left
+        return (left << self.half) | right
+
+    def forward(self, i):
+        """Item at position i"""
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+    def inverse(self, x):
+        """Position of item x"""
+        i = self._decrypt(x)
+        while i >= self.n:
+            i = self._decrypt(i)
+        return i
+
+class RandomOrder:
+    """
+    The random browse order: position -> post through a seeded permutation
+    of the sorted post IDs. Removed posts are tombstoned and skipped, so
+    nothing is shuffled, searched or shifted per navigation.
+    """
+
+    def __init__(self, post_ids, seed=None):
+        self.posts = sorted(post_ids)
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.perm = FeistelPermutation(len(self.posts), self.seed)
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.posts) - len(self.removed)
+
+    def position(self, post_id):
+        """Position of a post, or None if it isn't in the order"""
+        i = bisect.bisect_left(self.posts, post_id)
+        if i == len(self.posts) or self.posts[i] != post_id or post_id in self.removed:
+            return None
+        return self.perm.inverse(i)
+
+    def post_at(self, position, direction=1):
+        """
+        First live post at or after position (before it if direction < 0).
+        Returns (position, post_id), or (position, None) if every post is removed.
+        """
+        n = len(self.posts)
+        if not len(self):
+            return position, None
+
+        position %= n
+        while True:
+            post_id = self.posts[self.perm.forward(position)]
+            if post_id not in self.removed:
+                return position, post_id
+            position = (position + (1 if direction >= 0 else -1)) % n
+
+    def step(self, position, step):
+        """Move step positions, skipping removed posts"""
+        return self.post_at(position + step, step)
+
+    def add(self, post_ids):
+        """
+        Add new posts (or bring back removed ones). The permutation depends
+        on the post count, so adding re-deals the order with the same seed;
+        callers look their position up again with position().
+        """
+        grown = False
+        for post_id in post_ids:
+            if post_id in self.removed:
+                self.removed.discard(post_id)
+                continue
+            i = bisect.bisect_left(self.posts, post_id)
+            if i == len(self.posts) or self.posts[i] != post_id:
+                self.posts.insert(i, post_id)
+                grown = True
+        if grown:
+            self.perm = FeistelPermutation(len(self.posts), self.seed)
+
+    def remove(self, post_id):
+        """Tombstone a post"""
+        if self.position(post_id) is not None:
+            self.removed.add(post_id)
@@ -0,0 +1,134 @@
+import os
+import heapq
+import threading
+import itertools
+from concurrent.futures import Future
+from config import *
+
+# Priority classes, most urgent first
+PRIORITY_VISIBLE_IMAGE = 0  # The image the user is waiting for
+PRIORITY_VIDEO_FRAME = 1    # Frames of the playing video
+PRIORITY_THUMBNAIL = 2      # Thumbnails on screen
+PRIORITY_PREFETCH = 3       # Neighbouring posts
+PRIORITY_BACKGROUND = 4     # Cache building, indexing
+
+class Scheduler:
+    """
+    One worker pool for all decoding and file I/O.
+
+    Tasks run in priority order (FIFO within a class). At most disk_limit
+    lower-priority tasks touch the same disk at once (visible images and
+    video frames are never held back by it), and reserved workers only ever take
+    visible-image and video-frame tasks, so background work can't hold up
+    what the user is looking at. submit() returns a Future; cancelling it
+    before it starts drops the task.
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, disk_limit=SCHEDULER_DISK_LIMIT,
+                 reserved=SCHEDULER_RESERVED_WORKERS):
+        self.workers = workers or os.cpu_count() or 4
+        self.disk_limit = disk_limit
+        self.reserved = min(reserved, self.workers - 1)
+
+        self.queue = []  # (priority, seq, future, fn, args, disk)
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.disk_busy = {}    # disk -> running tasks
+        self.devices = {}      # directory -> disk id (cached)
+        self.running_low = 0   # Running tasks below video-frame priority
+
+        for i in range(self.workers):
+            threading.Thread(target=self.worker, name=f'scheduler-{i}', daemon=True).start()
+
+    def disk_of(self, path):
+        """Disk a path lives on: drive letter, or device id of its folder"""
+        path = os.path.abspath(path)
+        drive = os.path.splitdrive(path)[0]
+        if drive:
+            return drive.upper()
+
+        folder = os.path.dirname(path)
+        disk = self.devices.get(folder)
+        if disk is None:
+            try:
+                disk = os.stat(folder).st_dev
+            except OSError:
+                # Inside an archive, or gone - the nearest folder that exists decides
+                disk = self.disk_of(folder) if os.path.dirname(folder) != folder else folder
+            self.devices[folder] = disk
+        return disk
+
+    def submit(self, fn, *args, priority=PRIORITY_BACKGROUND, path=None):
+        """Queue fn(*args); path (if given) is the file it reads, for per-disk limits"""
+        future = Future()
+        disk = self.disk_of(path) if path else None
+        with self.cond:
+            heapq.heappush(self.queue, (priority, next(self.seq), future, fn, args, disk))
+            self.cond.notify()
+        return future
+
+    def _take(self):
+        """Best runnable task, or None (caller holds the lock)"""
+        skipped = []
+        task = None
+        low_slots = self.workers - self.reserved - self.running_low
+
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            priority, _, future, _, _, disk = entry
+            if future.cancelled():
+                continue
+            if priority > PRIORITY_VIDEO_FRAME and low_slots <= 0:
+                skipped.append(entry)
+                break  # Everything after this is low priority too
+            # The disk cap only holds back background work, never what the user waits for
+            if (priority > PRIORITY_VIDEO_FRAME and disk is not None
+                    and self.disk_busy.get(disk, 0) >= self.disk_limit):
+                skipped.append(entry)
+                continue
+            task = entry
+            break
+
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+        return task
+
+    def worker(self):
+        while True:
+            with self.cond:
+                task = self._take()
+                while task is None:
+                    self.cond.wait()
+                    task = self._take()
+
+                priority, _, future, fn, args, disk = task
+                if disk is not None:
+                    self.disk_busy[disk] = self.disk_busy.get(disk, 0) + 1
+                if priority > PRIORITY_VIDEO_FRAME:
+                    self.running_low += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.cond:
+                    if disk is not None:
+                        self.disk_busy[disk] -= 1
+                    if priority > PRIORITY_VIDEO_FRAME:
+                        self.running_low -= 1
+                    # A disk or worker slot was freed
+                    self.cond.notify_all()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """The shared scheduler (started on first use)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
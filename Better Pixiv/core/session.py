@@ -0,0 +1,23 @@
+import os
+import json
+from config import *
+
+def load_session(filename=SESSION_FILE):
+    """Saved session (random order, mode, artist, history), or {}"""
+    if os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring saved session: {e}")
+    return {}
+
+def save_session(session, filename=SESSION_FILE):
+    """Write the session atomically"""
+    tmp = filename + '.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp, filename)
+    except OSError as e:
+        print(f"Could not save session: {e}")
@@ -0,0 +1,196 @@
+import random
+from collections import deque
+from config import *
+
+class FenwickTree:
+    """Prefix sums over weights with O(log n) updates and weighted search"""
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.tree = [0.0] + list(weights)
+        # O(n) build: push each node's sum up to its parent
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+        self.top_bit = 1
+        while self.top_bit * 2 <= self.size:
+            self.top_bit *= 2
+
+    def add(self, i, delta):
+        """Add delta to weight i (0-based)"""
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def append(self, weight):
+        """Add a weight at the end in O(log n)"""
+        self.size += 1
+        i = self.size
+        # Node i covers (i - lowbit(i), i]: its own weight plus the nodes below it
+        node = weight
+        j = i - 1
+        while j > i - (i & -i):
+            node += self.tree[j]
+            j -= j & -j
+        self.tree.append(node)
+        if self.top_bit * 2 <= self.size:
+            self.top_bit *= 2
+
+    def total(self):
+        total = 0.0
+        i = self.size
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target):
+        """Smallest 0-based index whose prefix sum exceeds target"""
+        pos = 0
+        step = self.top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step //= 2
+        return min(pos, self.size - 1)
+
+class SmartShuffle:
+    """
+    Weighted random browsing: posts with more points/nice and newer posts
+    come up more often. Drawing is O(log n), and a rating click re-weights
+    one post. The last no_repeat posts are held out (weight 0) until they
+    leave the window.
+    """
+
+    def __init__(self, file_manager, database, no_repeat=SHUFFLE_NO_REPEAT):
+        self.file_manager = file_manager
+        self.database = database
+        self.no_repeat = no_repeat
+
+        self.post_ids = []
+        self.slots = {}        # post_id -> slot in post_ids / tree
+        self.weights = []      # Real weight per slot (also for held-out posts)
+        self.tree = None
+        self.recent = deque()  # Held-out slots, oldest first
+        self.held = set()
+
+        # Drawn posts, so Left can go back
+        self.history = []
+        self.cursor = -1
+
+    def build(self):
+        """Compute all weights (once, or after posts were added)"""
+        self.post_ids = list(self.file_manager.all_posts.keys())
+        self.slots = {post_id: i for i, post_id in enumerate(self.post_ids)}
+
+        numeric = [int(p) for p in self.post_ids if p.isdigit()]
+        self.min_id = min(numeric, default=0)
+        self.id_span = max(max(numeric, default=0) - self.min_id, 1)
+
+        self.weights = [self.weight(post_id) for post_id in self.post_ids]
+        self.tree = FenwickTree(self.weights)
+        self.recent.clear()
+        self.held.clear()
+        print(f"Smart shuffle ready: {len(self.post_ids)} posts")
+
+    def weight(self, post_id):
+        """Base 1, plus ratings, plus up to SHUFFLE_RECENCY_WEIGHT for the newest post"""
+        # Posts added after build() can be newer than the newest one it saw
+        recency = min((int(post_id) - self.min_id) / self.id_span, 1.0) if post_id.isdigit() else 0
+        return (1.0
+                + SHUFFLE_POINTS_WEIGHT * self.database.get_points(post_id)
+                + SHUFFLE_NICE_WEIGHT * self.database.get_nice(post_id)
+                + SHUFFLE_RECENCY_WEIGHT * recency)
+
+    def _set_weight(self, slot, weight):
+        """Change a slot's weight; held-out slots keep 0 in the tree until released"""
+        old = self.weights[slot]
+        self.weights[slot] = weight
+        if slot not in self.held:
+            self.tree.add(slot, weight - old)
+
+    def _hold(self, slot):
+        self.tree.add(slot, -self.weights[slot])
+        self.held.add(slot)
+        self.recent.append(slot)
+        while len(self.recent) > self.no_repeat:
+            self._release()
+
+    def _release(self):
+        slot = self.recent.popleft()
+        self.held.discard(slot)
+        self.tree.add(slot, self.weights[slot])
+
+    def draw(self):
+        """Pick a post by weight, skipping the no-repeat window"""
+        if self.tree is None:
+            self.build()
+        if not self.post_ids:
+            return None
+
+        total = self.tree.total()
+        while total <= 0 and self.recent:
+            # Window covers every post - let the oldest come back
+            self._release()
+            total = self.tree.total()
+        if total <= 0:
+            return None
+
+        slot = self.tree.find(random.random() * total)
+        self._hold(slot)
+        return self.post_ids[slot]
+
+    def next(self):
+        """Next post: replay forward history first, then draw a new one"""
+        if self.cursor + 1 < len(self.history):
+            self.cursor += 1
+            return self.history[self.cursor]
+
+        post_id = self.draw()
+        if post_id is not None:
+            self.history.append(post_id)
+            if len(self.history) > SHUFFLE_HISTORY:
+                del self.history[0]
+            self.cursor = len(self.history) - 1
+        return post_id
+
+    def prev(self):
+        """Previously shown post, or None at the start of the history"""
+        if self.cursor > 0:
+            self.cursor -= 1
+            return self.history[self.cursor]
+        return None
+
+    def on_ratings_changed(self, post_id):
+        """Database listener: re-weight one post"""
+        slot = self.slots.get(post_id)
+        if self.tree is not None and slot is not None:
+            self._set_weight(slot, self.weight(post_id))
+
+    def add_post(self, post_id):
+        """New post: one more slot at the end of the tree"""
+        weight = self.weight(post_id)
+        self.slots[post_id] = len(self.post_ids)
+        self.post_ids.append(post_id)
+        self.weights.append(weight)
+        self.tree.append(weight)
+
+    def on_post_changed(self, post_id):
+        """A post's files were added, deleted or moved"""
+        if self.tree is None:
+            return
+        slot = self.slots.get(post_id)
+        if post_id in self.file_manager.all_posts:
+            if slot is None:
+                self.add_post(post_id)
+            else:
+                self._set_weight(slot, self.weight(post_id))  # Back after a removal
+        elif slot is not None:
+            self._set_weight(slot, 0.0)
+            self.history = [p for p in self.history if p != post_id]
+            self.cursor = min(self.cursor, len(self.history) - 1)
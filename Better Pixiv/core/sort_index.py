@@ -0,0 +1,192 @@
+import os
+import bisect
+import heapq
+from config import *
+from core.scheduler import get_scheduler, PRIORITY_BACKGROUND
+
+_MISSING = object()
+
+class SortedIndex:
+    """
+    Post IDs kept sorted by a key function.
+
+    Entries are (key, post_id) tuples in a sorted list, so a post's position
+    is a bisect and re-keying one post moves a single entry instead of
+    re-sorting the whole library.
+    """
+
+    def __init__(self, key_func, post_ids, descending=False, initial_key=None):
+        # initial_key: a cheaper key for the first build (e.g. a bulk-loaded dict)
+        self.key_func = key_func
+        self.descending = descending
+        self.keys = {post_id: (initial_key or key_func)(post_id) for post_id in post_ids}
+        self.entries = sorted((key, post_id) for post_id, key in self.keys.items())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, post_id):
+        return post_id in self.keys
+
+    def update(self, post_id):
+        """Re-key one post (adds it if new)"""
+        self.remove(post_id)
+        key = self.key_func(post_id)
+        self.keys[post_id] = key
+        bisect.insort(self.entries, (key, post_id))
+
+    def remove(self, post_id):
+        key = self.keys.pop(post_id, _MISSING)
+        if key is not _MISSING:
+            del self.entries[bisect.bisect_left(self.entries, (key, post_id))]
+
+    def position(self, post_id):
+        """Position of a post in browse order, or None"""
+        key = self.keys.get(post_id, _MISSING)
+        if key is _MISSING:
+            return None
+        i = bisect.bisect_left(self.entries, (key, post_id))
+        return len(self.entries) - 1 - i if self.descending else i
+
+    def post_at(self, position):
+        """Post ID at a position in browse order"""
+        i = len(self.entries) - 1 - position if self.descending else position
+        return self.entries[i][1]
+
+    def top(self, k):
+        """First k posts in browse order"""
+        if self.descending:
+            return [post_id for _, post_id in reversed(self.entries[-k:])] if k > 0 else []
+        return [post_id for _, post_id in self.entries[:k]]
+
+def top_posts(post_ids, key_func, k):
+    """Top k posts of any subset by key, O(N log k)"""
+    return heapq.nlargest(k, post_ids, key=key_func)
+
+class BrowseIndexes:
+    """
+    One SortedIndex per browse order, built the first time the order is used
+    and kept up to date as ratings change and files are deleted or moved.
+
+    Building stats every file (mtime) or reads every rating, so it runs on
+    the scheduler at background priority; get() returns None until the
+    index is ready. call_soon(fn) runs fn on the thread that owns the
+    indexes (Tk's after), where the index is installed and posts changed
+    during the build are re-keyed.
+    """
+
+    # Highest first, except post_id which follows upload order
+    DESCENDING = {'points': True, 'nice': True, 'post_id': False, 'mtime': True, 'pages': True}
+
+    def __init__(self, file_manager, database, call_soon=None):
+        self.file_manager = file_manager
+        self.database = database
+        self.call_soon = call_soon or (lambda fn: fn())
+        self.indexes = {}
+        self.building = {}  # order -> post IDs changed since its build started
+        self.ready_callbacks = {}  # order -> [callback(index)]
+
+    def key_func(self, order):
+        if order == 'points':
+            return self.database.get_points
+        if order == 'nice':
+            return self.database.get_nice
+        if order == 'post_id':
+            return lambda post_id: int(post_id) if post_id.isdigit() else -1
+        if order == 'mtime':
+            return self.post_mtime
+        if order == 'pages':
+            return lambda post_id: len(self.file_manager.get_post_files(post_id))
+        raise ValueError(f"Unknown browse order: {order}")
+
+    def post_mtime(self, post_id):
+        """Newest modification time among a post's files"""
+        mtime = 0
+        for file_info in self.file_manager.get_post_files(post_id):
+            try:
+                mtime = max(mtime, os.path.getmtime(file_info.get('archive') or file_info['full_path']))
+            except OSError:
+                pass
+        return mtime
+
+    def bulk_key(self, order):
+        """Key for the first build: all ratings in one read instead of one per post"""
+        if order == 'points':
+            return self.database.all_points().get
+        if order == 'nice':
+            return self.database.all_nice().get
+        return None
+
+    def get(self, order, on_ready=None):
+        """
+        Index for a browse order, or None while it is built in the background
+        (on_ready(index) is called on the owning thread once it's there)
+        """
+        index = self.indexes.get(order)
+        if index is not None:
+            return index
+        if on_ready:
+            self.ready_callbacks.setdefault(order, []).append(on_ready)
+        if order not in self.building:
+            print(f"Building {order} index...")
+            self.building[order] = set()
+            get_scheduler().submit(self._build, order, list(self.file_manager.all_posts),
+                                   priority=PRIORITY_BACKGROUND)
+        return None
+
+    def _build(self, order, post_ids):
+        """Scheduler task: sort a snapshot of the posts, then install it on the owning thread"""
+        try:
+            bulk = self.bulk_key(order)
+            index = SortedIndex(self.key_func(order), post_ids, descending=self.DESCENDING[order],
+                                initial_key=(lambda post_id: bulk(post_id, 0)) if bulk else None)
+        except Exception as e:
+            print(f"Error building {order} index: {e}")
+            self.call_soon(lambda: self.building.pop(order, None))
+            return
+        self.call_soon(lambda: self._install(order, index))
+
+    def _install(self, order, index):
+        """Owning thread: catch up with posts changed during the build and publish the index"""
+        for post_id in self.building.pop(order, ()):
+            if post_id in self.file_manager.all_posts:
+                index.update(post_id)
+            else:
+                index.remove(post_id)
+        self.indexes[order] = index
+        print(f"{order} index ready ({len(index)} posts)")
+        for callback in self.ready_callbacks.pop(order, []):
+            callback(index)
+
+    def top(self, order, k, post_ids=None):
+        """Top k posts of an order, optionally only among post_ids ([] while it's built)"""
+        index = self.get(order)
+        if index is None:
+            return []
+        if post_ids is None:
+            return index.top(k)
+        key = lambda post_id: (index.keys.get(post_id, 0), post_id)
+        if index.descending:
+            return top_posts(post_ids, key, k)
+        return heapq.nsmallest(k, post_ids, key=key)
+
+    def on_ratings_changed(self, post_id):
+        """Database listener: re-key the post in the rating indexes"""
+        if post_id not in self.file_manager.all_posts:
+            return
+        for order in ('points', 'nice'):
+            if order in self.indexes:
+                self.indexes[order].update(post_id)
+            elif order in self.building:
+                self.building[order].add(post_id)
+
+    def on_post_changed(self, post_id):
+        """A post's files were deleted or moved"""
+        exists = post_id in self.file_manager.all_posts
+        for changed in self.building.values():
+            changed.add(post_id)
+        for index in self.indexes.values():
+            if exists:
+                index.update(post_id)
+            else:
+                index.remove(post_id)
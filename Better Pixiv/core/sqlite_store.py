@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+from config import *
+from core.database import SCHEMA_VERSION, find_image_based_ratings
+
+class SqliteDatabase:
+    """
+    SQLite storage engine with the same API as Database.
+
+    Ratings are queried on demand instead of being loaded at startup.
+    WAL mode keeps each click to one small append to the WAL file.
+    The meta table holds a schema_version row, so the image-based ->
+    post-based migration runs exactly once.
+    """
+
+    def __init__(self, path=DATABASE_SQLITE_FILE):
+        is_new = not os.path.exists(path)
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.listeners = []
+        # Autocommit; explicit transactions where several statements belong together
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        # First run on an existing JSON library - bring the ratings along
+        if is_new and (os.path.exists(POINTS_FILE) or os.path.exists(NICE_FILE)):
+            print(f"Importing JSON ratings into {path}")
+            from core.database import Database
+            json_db = Database()
+            self.import_ratings(json_db.points_db, json_db.nice_db, json_db.schema_version())
+            json_db.close()
+
+        self.migrate_to_post_based()
+
+    def _create_schema(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ratings (
+                post_id TEXT PRIMARY KEY,
+                points INTEGER NOT NULL DEFAULT 0,
+                nice INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', '1')")
+
+    def schema_version(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        return int(row[0]) if row else 1
+
+    def migrate_to_post_based(self):
+        """Migrate from image-based to post-based storage (runs once)"""
+        if self.schema_version() >= SCHEMA_VERSION:
+            return
+
+        print("Checking for database migration...")
+        rows = self.conn.execute("SELECT post_id, points, nice FROM ratings").fetchall()
+        old_points, old_nice = find_image_based_ratings(
+            ((post_id, points) for post_id, points, _ in rows if points),
+            ((post_id, nice) for post_id, _, nice in rows if nice)
+        )
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            for post_id, total_points in old_points.items():
+                self.conn.execute("""
+                    INSERT INTO ratings (post_id, points) VALUES (?, ?)
+                    ON CONFLICT(post_id) DO UPDATE SET points = excluded.points
+                """, (post_id, total_points))
+            for post_id, max_nice in old_nice.items():
+                self.conn.execute("""
+                    INSERT INTO ratings (post_id, nice) VALUES (?, ?)
+                    ON CONFLICT(post_id) DO UPDATE SET nice = excluded.nice
+                """, (post_id, max_nice))
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'",
+                              (str(SCHEMA_VERSION),))
+            self.conn.execute("COMMIT")
+
+        if old_points or old_nice:
+            print(f"Migrated {len(old_points)} posts from image-based to post-based storage")
+
+    def import_ratings(self, points_db, nice_db, schema_version=1):
+        """
+        Bulk import points/nice dicts (e.g. from the JSON files).
+        schema_version is the source's: 1 if its keys may still be image-based.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("""
+                INSERT INTO ratings (post_id, points) VALUES (?, ?)
+                ON CONFLICT(post_id) DO UPDATE SET points = excluded.points
+            """, points_db.items())
+            self.conn.executemany("""
+                INSERT INTO ratings (post_id, nice) VALUES (?, ?)
+                ON CONFLICT(post_id) DO UPDATE SET nice = excluded.nice
+            """, nice_db.items())
+            # Already-migrated totals must not be summed up again
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'",
+                              (str(schema_version),))
+            self.conn.execute("COMMIT")
+
+    def _get(self, column, post_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {column} FROM ratings WHERE post_id = ?",
+                                    (post_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _increment(self, column, post_id):
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(f"""
+                INSERT INTO ratings (post_id, {column}) VALUES (?, 1)
+                ON CONFLICT(post_id) DO UPDATE SET {column} = {column} + 1
+            """, (post_id,))
+            row = self.conn.execute(f"SELECT {column} FROM ratings WHERE post_id = ?",
+                                    (post_id,)).fetchone()
+            self.conn.execute("COMMIT")
+        self._notify(post_id)
+        return row[0]
+
+    def add_listener(self, callback):
+        """Call callback(post_id) whenever a post's ratings change"""
+        self.listeners.append(callback)
+
+    def _notify(self, post_id):
+        for callback in self.listeners:
+            callback(post_id)
+
+    def get_points(self, post_id):
+        """Get points for a post"""
+        return self._get('points', post_id)
+
+    def get_nice(self, post_id):
+        """Get nice for a post"""
+        return self._get('nice', post_id)
+
+    def _get_all(self, column):
+        # One query instead of one per post (building a sorted browse order)
+        with self.lock:
+            return dict(self.conn.execute(f"SELECT post_id, {column} FROM ratings WHERE {column} != 0"))
+
+    def all_points(self):
+        """post_id -> points for every rated post"""
+        return self._get_all('points')
+
+    def all_nice(self):
+        """post_id -> nice for every post with nice"""
+        return self._get_all('nice')
+
+    def add_point(self, post_id):
+        """Add point to a post"""
+        return self._increment('points', post_id)
+
+    def add_nice(self, post_id):
+        """Add nice to a post"""
+        return self._increment('nice', post_id)
+
+    def remove_file(self, filename):
+        """Remove file from both databases (for compatibility)"""
+        pass
+
+    def remove_post(self, post_id):
+        """Remove post from databases"""
+        with self.lock:
+            self.conn.execute("DELETE FROM ratings WHERE post_id = ?", (post_id,))
+        self._notify(post_id)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,3 +1,99 @@
+from config import *
+
+class NavigationHistory:
+    """
+    Back/forward history of visited posts.
+    
+    A fixed-size ring buffer addressed by ever-increasing sequence numbers
+    (entry seq lives in slot seq % capacity), plus a dict post_id -> latest
+    seq, so membership checks are O(1) and memory stays bounded.
+    """
+    
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.index = {}   # post_id -> seq of its latest visit
+        self.first = 0    # Oldest seq still stored
+        self.end = 0      # One past the newest seq
+        self.cursor = -1  # seq of the current entry
+    
+    def __len__(self):
+        return self.end - self.first
+    
+    def __contains__(self, post_id):
+        return post_id in self.index
+    
+    def _get(self, seq):
+        return self.slots[seq % self.capacity]
+    
+    def _drop(self, seq):
+        post_id = self._get(seq)
+        if self.index.get(post_id) == seq:
+            del self.index[post_id]
+        self.slots[seq % self.capacity] = None
+    
+    def current(self):
+        return self._get(self.cursor) if self.first <= self.cursor < self.end else None
+    
+    def visit(self, post_id):
+        """Record a visit; going somewhere new drops the forward entries"""
+        if post_id == self.current():
+            return
+        
+        while self.end > self.cursor + 1:
+            self.end -= 1
+            self._drop(self.end)
+        
+        if self.end - self.first == self.capacity:
+            self._drop(self.first)
+            self.first += 1
+        
+        self.slots[self.end % self.capacity] = post_id
+        self.index[post_id] = self.end
+        self.cursor = self.end
+        self.end += 1
+    
+    def back(self):
+        """Step back, returns the post id or None"""
+        if self.cursor - 1 >= self.first:
+            self.cursor -= 1
+            return self.current()
+        return None
+    
+    def forward(self):
+        """Step forward, returns the post id or None"""
+        if self.cursor + 1 < self.end:
+            self.cursor += 1
+            return self.current()
+        return None
+    
+    def neighbours(self, radius):
+        """Post ids around the cursor, nearest first"""
+        result = []
+        for distance in range(1, radius + 1):
+            for seq in (self.cursor - distance, self.cursor + distance):
+                if self.first <= seq < self.end:
+                    result.append(self._get(seq))
+        return result
+    
+    def to_dict(self):
+        return {
+            'entries': [self._get(seq) for seq in range(self.first, self.end)],
+            'cursor': self.cursor - self.first
+        }
+    
+    def load(self, data):
+        """Restore from to_dict() output"""
+        entries = data.get('entries', [])[-self.capacity:]
+        cursor = data.get('cursor', len(entries) - 1)
+        cursor -= len(data.get('entries', [])) - len(entries)
+        
+        self.__init__(self.capacity)
+        for post_id in entries:
+            self.visit(post_id)
+        if entries:
+            self.cursor = min(max(cursor, 0), len(entries) - 1)
+
 class AppState:
     def __init__(self):
         self.reset()
@@ -8,7 +104,7 @@ class AppState:
         self.current_artist_id = None
         self.current_page_idx = 0
         self.current_work = []
-        self.history = []
+        self.history = NavigationHistory()
         
         # Artist mode navigation
         self.artist_works = []
@@ -26,9 +122,8 @@ class AppState:
         self.current_work = work_files
         self.current_page_idx = 0
         
-        # Add to history if not already there
-        if post_id not in self.history:
-            self.history.append(post_id)
+        # Back/forward steps already moved the cursor onto this post
+        self.history.visit(post_id)
     
     def set_artist_mode(self, artist_id, works):
         """Enter artist mode"""
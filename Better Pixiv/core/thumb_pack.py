@@ -0,0 +1,154 @@
+import os
+import mmap
+import threading
+from config import *
+
+def try_lock(f):
+    """Exclusive non-blocking lock on an open file; False if another process holds it"""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+class ThumbnailPack:
+    """
+    Thumbnails stored in a few large append-only pack files.
+
+    pack_NNNN.bin  - encoded thumbnails back to back
+    index.txt      - one "key pack offset length" line per thumbnail
+
+    Data is written before its index line, so a crash can only leave
+    unreferenced bytes behind, never a broken entry. Reads are slices of
+    an mmap of the pack, so no file is opened per thumbnail.
+    Only one process writes to a pack directory at a time: the writer
+    holds an exclusive lock on write.lock, and a pack opened while another
+    process holds it is read-only (append does nothing).
+    """
+
+    def __init__(self, pack_dir=THUMB_PACK_DIR, max_pack_bytes=THUMB_PACK_MAX_MB * 1024 * 1024):
+        self.pack_dir = pack_dir
+        self.max_pack_bytes = max_pack_bytes
+        self.index_path = os.path.join(pack_dir, 'index.txt')
+
+        self.index = {}  # key -> (pack number, offset, length)
+        self.maps = {}   # pack number -> (file, mmap)
+        self.lock = threading.Lock()
+
+        self.write_pack = 0
+        self.write_file = None
+        self.index_file = None
+
+        os.makedirs(pack_dir, exist_ok=True)
+        self.lock_file = open(os.path.join(pack_dir, 'write.lock'), 'a+b')
+        self.read_only = not try_lock(self.lock_file)
+        if self.read_only:
+            self.lock_file.close()
+            self.lock_file = None
+            print(f"{pack_dir} is being written by another process - new thumbnails won't be cached")
+        self._load_index()
+
+    def pack_path(self, pack_no):
+        return os.path.join(self.pack_dir, f'pack_{pack_no:04d}.bin')
+
+    def _load_index(self):
+        """Read the index, ignoring entries that point past the end of their pack"""
+        if not os.path.exists(self.index_path):
+            return
+
+        sizes = {}
+        with open(self.index_path, 'r', encoding='ascii', errors='ignore') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 4:
+                    continue  # Torn last line after a crash
+
+                key, pack_no, offset, length = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
+                if pack_no not in sizes:
+                    path = self.pack_path(pack_no)
+                    sizes[pack_no] = os.path.getsize(path) if os.path.exists(path) else 0
+                if offset + length <= sizes[pack_no]:
+                    self.index[key] = (pack_no, offset, length)
+
+        if sizes:
+            self.write_pack = max(sizes)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _get_map(self, pack_no, needed):
+        """mmap of a pack covering at least `needed` bytes (remapped as the pack grows)"""
+        entry = self.maps.get(pack_no)
+        if entry and len(entry[1]) >= needed:
+            return entry[1]
+
+        if entry:
+            entry[1].close()
+            entry[0].close()
+
+        f = open(self.pack_path(pack_no), 'rb')
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps[pack_no] = (f, mm)
+        return mm
+
+    def read(self, key):
+        """Get the encoded bytes of a thumbnail, or None"""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+
+        pack_no, offset, length = entry
+        with self.lock:
+            mm = self._get_map(pack_no, offset + length)
+            return mm[offset:offset + length]
+
+    def append(self, key, data):
+        """Store encoded thumbnail bytes"""
+        with self.lock:
+            if self.read_only or key in self.index:
+                return
+
+            if self.write_file is None:
+                self.write_file = open(self.pack_path(self.write_pack), 'ab')
+                self.index_file = open(self.index_path, 'a', encoding='ascii')
+
+            offset = self.write_file.tell()
+            if offset and offset + len(data) > self.max_pack_bytes:
+                # Start a new pack
+                self.write_file.close()
+                self.write_pack += 1
+                self.write_file = open(self.pack_path(self.write_pack), 'ab')
+                # Not necessarily 0: a crash can leave unreferenced bytes in the next pack
+                offset = self.write_file.tell()
+
+            self.write_file.write(data)
+            self.write_file.flush()
+            self.index_file.write(f"{key} {self.write_pack} {offset} {len(data)}\n")
+            self.index_file.flush()
+
+            self.index[key] = (self.write_pack, offset, len(data))
+
+    def close(self):
+        with self.lock:
+            for f, mm in self.maps.values():
+                mm.close()
+                f.close()
+            self.maps = {}
+
+            if self.write_file:
+                self.write_file.close()
+                self.index_file.close()
+                self.write_file = None
+                self.index_file = None
+
+            if self.lock_file:
+                self.lock_file.close()  # Releases the lock
+                self.lock_file = None
@@ -0,0 +1,106 @@
+import os
+import hashlib
+import cv2
+from io import BytesIO
+from PIL import Image, ImageDraw
+from config import *
+from core.ugoira import load_ugoira_thumbnail
+from core.thumb_pack import ThumbnailPack
+from core.archive import media_path, media_source, media_stat
+
+def open_source_image(file_info, size):
+    """Decode just enough of a file to build a thumbnail of the given size"""
+    if file_info.get('is_ugoira'):
+        return load_ugoira_thumbnail(media_path(file_info))
+
+    if file_info.get('is_video'):
+        cap = cv2.VideoCapture(media_path(file_info))
+        try:
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            raise ValueError("cannot read first video frame")
+        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        return add_video_badge(img)
+
+    with media_source(file_info) as source:
+        img = Image.open(source)
+        # JPEG can decode straight to a reduced scale
+        img.draft('RGB', (size, size))
+        img.load()
+    return img
+
+def add_video_badge(img):
+    """Draw a small play triangle so video thumbnails stand out"""
+    draw = ImageDraw.Draw(img)
+    w, h = img.size
+    s = max(8, min(w, h) // 5)
+    x, y = 4, h - s - 4
+    draw.polygon([(x, y), (x, y + s), (x + s, y + s // 2)], fill='#ff0000', outline='white')
+    return img
+
+def render_thumbnail(file_info, size=THUMBNAIL_SIZE):
+    """Decode a source file into an RGB thumbnail"""
+    img = open_source_image(file_info, size)
+    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+def encode_thumbnail(img):
+    """Encode a thumbnail for storage"""
+    buf = BytesIO()
+    img.save(buf, 'JPEG', quality=THUMB_CACHE_QUALITY)
+    return buf.getvalue()
+
+def thumbnail_key(path, size, stat=None):
+    """Content key - changes whenever the source file changes"""
+    stat = stat or os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{size}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class ThumbnailCache:
+    """
+    Disk cache of downscaled thumbnails keyed by path + file size + mtime + thumb size.
+    Thumbnails live in append-only pack files (see ThumbnailPack).
+    """
+
+    def __init__(self, pack=None):
+        self.pack = pack if pack is not None else ThumbnailPack()
+
+    def cache_key(self, path, size, stat=None):
+        return thumbnail_key(path, size, stat)
+
+    def load(self, key):
+        """Read a cached thumbnail, or None"""
+        data = self.pack.read(key)
+        if data is None:
+            return None
+        try:
+            img = Image.open(BytesIO(data))
+            img.load()
+            return img
+        except Exception as e:
+            print(f"Ignoring broken cached thumbnail {key}: {e}")
+            return None
+
+    def store(self, key, img):
+        """Append a thumbnail to the pack"""
+        try:
+            self.pack.append(key, encode_thumbnail(img))
+        except OSError as e:
+            print(f"Could not cache thumbnail: {e}")
+
+    def get(self, file_info, size=THUMBNAIL_SIZE, key=None):
+        """Get a thumbnail as a PIL image, building and caching it if needed"""
+        key = key or self.cache_key(file_info['full_path'], size, media_stat(file_info))
+
+        img = self.load(key)
+        if img is not None:
+            return img
+
+        img = render_thumbnail(file_info, size)
+        self.store(key, img)
+        return img
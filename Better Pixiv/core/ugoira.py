@@ -0,0 +1,91 @@
+import os
+import json
+import threading
+import zipfile
+from io import BytesIO
+from PIL import Image
+from config import *
+from core.animation import AnimationSource
+from core.file_manager import ugoira_sidecars
+
+FRAME_EXTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+def _frames_from_metadata(data):
+    """
+    Pull the frame list out of the ugoira metadata formats we know:
+    - PixivUtil2 / gallery-dl: {"frames": [{"file": ..., "delay": ...}]}
+    - Pixiv API: {"body": {"frames": [...]}}
+    - Plain list of frames
+    """
+    if isinstance(data, dict):
+        if 'body' in data and isinstance(data['body'], dict):
+            data = data['body']
+        data = data.get('frames', data.get('ugoira_frames'))
+    if not isinstance(data, list):
+        return None
+    return [(frame['file'], int(frame.get('delay', UGOIRA_DEFAULT_DELAY)))
+            for frame in data if isinstance(frame, dict) and 'file' in frame]
+
+def read_ugoira_frames(zf, zip_path):
+    """Get [(member_name, delay_ms)] for a ugoira zip"""
+    names = zf.namelist()
+    frame_names = sorted(n for n in names if n.lower().endswith(FRAME_EXTS))
+
+    # Metadata inside the zip
+    for name in names:
+        if name.lower().endswith(('.json', '.ugoira')):
+            try:
+                frames = _frames_from_metadata(json.loads(zf.read(name).decode('utf-8')))
+            except (ValueError, UnicodeDecodeError):
+                frames = None
+            if frames:
+                return [f for f in frames if f[0] in names]
+
+    # Sidecar metadata next to the zip
+    for sidecar in ugoira_sidecars(zip_path):
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                frames = _frames_from_metadata(json.load(f))
+        except (OSError, ValueError):
+            frames = None
+        if frames:
+            return [f for f in frames if f[0] in names]
+
+    # No metadata - constant delay
+    return [(name, UGOIRA_DEFAULT_DELAY) for name in frame_names]
+
+def load_ugoira_thumbnail(path):
+    """Decode only the first frame of a ugoira zip"""
+    with zipfile.ZipFile(path) as zf:
+        frames = read_ugoira_frames(zf, path)
+        if not frames:
+            raise ValueError("ugoira has no frames")
+        with zf.open(frames[0][0]) as f:
+            img = Image.open(f)
+            img.load()
+            return img
+
+class UgoiraSource(AnimationSource):
+    """Ugoira zip played straight from the archive with a bounded frame buffer"""
+
+    def __init__(self, path, buffer_size=UGOIRA_FRAME_BUFFER):
+        super().__init__(buffer_size)
+        self.path = path
+        self.zip_lock = threading.Lock()
+        self.zip_file = zipfile.ZipFile(path)
+
+        frames = read_ugoira_frames(self.zip_file, path)
+        self.frame_names = [name for name, _ in frames]
+        self.delays = [max(10, delay) for _, delay in frames]
+        self.frame_count = len(frames)
+
+    def decode_frame(self, idx):
+        with self.zip_lock:
+            data = self.zip_file.read(self.frame_names[idx])
+
+        return Image.open(BytesIO(data)).convert('RGB')
+
+    def close(self):
+        super().close()
+        with self.zip_lock:
+            self.zip_file.close()
@@ -0,0 +1,221 @@
+import os
+import json
+import hashlib
+import cv2
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import *
+
+def probe_video(path):
+    """Read basic video metadata without decoding frames"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        return {
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': cap.get(cv2.CAP_PROP_FPS) or VIDEO_FPS,
+            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        }
+    finally:
+        cap.release()
+
+def _proxy_base(path):
+    """Cache location for a source video (without extension)"""
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(PROXY_CACHE_DIR, key)
+
+def _source_signature(path):
+    """mtime and size used to validate a proxy against its source"""
+    st = os.stat(path)
+    return {'src_mtime': st.st_mtime, 'src_size': st.st_size}
+
+def get_proxy_path(path):
+    """Return the proxy for a video if one exists and is still valid"""
+    base = _proxy_base(path)
+    proxy_path = base + '.mp4'
+    meta_path = base + '.json'
+
+    if not os.path.exists(proxy_path) or not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        signature = _source_signature(path)
+    except (OSError, ValueError):
+        return None
+
+    if (meta.get('src_mtime') != signature['src_mtime'] or
+            meta.get('src_size') != signature['src_size']):
+        return None
+
+    return proxy_path
+
+def needs_proxy(path, info=None):
+    """Check if a video is heavy enough to need a proxy"""
+    try:
+        if os.path.getsize(path) >= PROXY_MIN_SIZE_MB * 1024 * 1024:
+            return True
+    except OSError:
+        return False
+
+    info = info or probe_video(path)
+    if not info:
+        return False
+    return info['width'] > PROXY_MAX_WIDTH or info['height'] > PROXY_MAX_HEIGHT
+
+def _proxy_size(width, height):
+    """Scale a frame size down to fit the proxy box (even dimensions)"""
+    scale = min(1.0, PROXY_MAX_WIDTH / width, PROXY_MAX_HEIGHT / height)
+    return (max(2, int(width * scale) // 2 * 2),
+            max(2, int(height * scale) // 2 * 2))
+
+def transcode_proxy(path):
+    """
+    Transcode one video into a display-resolution proxy.
+    Runs in a worker process, so it only returns plain data.
+    """
+    base = _proxy_base(path)
+    proxy_path = base + '.mp4'
+    tmp_path = base + '.tmp.mp4'
+
+    os.makedirs(PROXY_CACHE_DIR, exist_ok=True)
+    signature = _source_signature(path)
+    cap = cv2.VideoCapture(path)
+    writer = None
+
+    try:
+        if not cap.isOpened():
+            return path, 'failed', "cannot open video"
+
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or VIDEO_FPS
+        out_size = _proxy_size(width, height)
+
+        writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, out_size)
+        if not writer.isOpened():
+            return path, 'failed', "cannot create proxy writer"
+
+        frames = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if (frame.shape[1], frame.shape[0]) != out_size:
+                frame = cv2.resize(frame, out_size, interpolation=cv2.INTER_AREA)
+            writer.write(frame)
+            frames += 1
+
+        writer.release()
+        writer = None
+
+        if frames == 0:
+            os.remove(tmp_path)
+            return path, 'failed', "no frames decoded"
+
+        os.replace(tmp_path, proxy_path)
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(dict(signature, source=os.path.abspath(path),
+                           width=out_size[0], height=out_size[1],
+                           fps=fps, frame_count=frames), f)
+        return path, 'done', f"{width}x{height} -> {out_size[0]}x{out_size[1]}, {frames} frames"
+    except Exception as e:
+        return path, 'failed', str(e)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+class ProxyBuilder:
+    """Offline builder that creates proxies for heavy videos with resumable progress"""
+
+    def __init__(self, progress_file=PROXY_PROGRESS_FILE, workers=PROXY_WORKERS):
+        self.progress_file = progress_file
+        self.workers = workers
+        self.progress = self._load_progress()
+
+    def _load_progress(self):
+        if os.path.exists(self.progress_file):
+            try:
+                with open(self.progress_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable proxy progress file: {e}")
+        return {}
+
+    def _save_progress(self):
+        tmp = self.progress_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.progress, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.progress_file)
+
+    def _already_handled(self, path):
+        """Skip videos finished (or skipped) in an earlier run if the source is unchanged"""
+        entry = self.progress.get(path)
+        if not entry:
+            return False
+        try:
+            signature = _source_signature(path)
+        except OSError:
+            return True
+        if (entry.get('src_mtime') != signature['src_mtime'] or
+                entry.get('src_size') != signature['src_size']):
+            return False
+        if entry['status'] == 'done':
+            return get_proxy_path(path) is not None
+        return entry['status'] == 'skipped'
+
+    def _record(self, path, status, message="", save=True):
+        """Note a video's outcome; save=False leaves the write to the caller"""
+        try:
+            entry = _source_signature(path)
+        except OSError:
+            entry = {}
+        entry['status'] = status
+        entry['message'] = message
+        self.progress[path] = entry
+        if save:
+            self._save_progress()
+
+    def build(self, video_paths):
+        """Transcode every heavy video in video_paths, skipping finished work"""
+        os.makedirs(PROXY_CACHE_DIR, exist_ok=True)
+
+        # Cheap outcomes are saved once after the scan; each transcode is saved as it finishes
+        pending = []
+        recorded = 0
+        for path in video_paths:
+            if self._already_handled(path):
+                continue
+            if get_proxy_path(path):
+                self._record(path, 'done', "existing proxy", save=False)
+                recorded += 1
+                continue
+            if not needs_proxy(path):
+                self._record(path, 'skipped', "below threshold", save=False)
+                recorded += 1
+                continue
+            pending.append(path)
+        if recorded:
+            self._save_progress()
+
+        print(f"Proxy builder: {len(pending)} videos to transcode, "
+              f"{len(video_paths) - len(pending)} already handled")
+        if not pending:
+            return
+
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(transcode_proxy, path) for path in pending]
+            for future in as_completed(futures):
+                path, status, message = future.result()
+                done += 1
+                self._record(path, status, message)
+                print(f"[{done}/{len(pending)}] {status}: {os.path.basename(path)} ({message})")
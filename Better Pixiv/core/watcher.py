@@ -0,0 +1,306 @@
+import os
+import sys
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from collections import defaultdict
+from config import *
+from core.file_manager import is_media_filename
+
+# inotify(7) event bits
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Files count once they're closed after writing, so half-done downloads don't show up
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+# Coarse filesystem timestamps (FAT: 2 s) - folders touched this close to the scan are listed again
+MTIME_SLACK = 2.0
+
+def load_inotify():
+    """libc with inotify, or None (not Linux, or no inotify)"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+class LibraryWatcher:
+    """
+    Picks up files added, removed or renamed in the library roots while the
+    app runs, without rescanning them.
+
+    Changes are queued as ('add' | 'remove', root path, file path) for the
+    Tk thread to fetch with drain(); a rename is a remove plus an add. Uses
+    inotify where available. Otherwise folder mtimes are polled every
+    WATCH_POLL_SECONDS and only folders whose mtime changed are listed, and
+    new files are reported once their size stops changing.
+
+    The startup scan is the baseline: folders modified after it are listed
+    once when the watcher starts, so nothing falls in between.
+    """
+
+    def __init__(self, file_manager, backend=WATCH_BACKEND):
+        # Snapshot of the startup scan, owned by the watcher thread from here on
+        self.roots = []
+        for root in file_manager.roots:
+            folders = defaultdict(set)
+            for folder in root['folders']:
+                folders[folder] = set()
+            for file_info in root['files']:
+                if file_info.get('archive'):
+                    continue  # Archives are read at startup only
+                folders[os.path.dirname(file_info['full_path'])].add(file_info['filename'])
+            self.roots.append({
+                'path': root['path'],
+                'skip': file_manager.other_roots(root),
+                'scanned_at': root['scanned_at'],
+                'folders': dict(folders),  # folder -> media file names
+                'mtimes': {}
+            })
+
+        self.events = queue.Queue()
+        self.stopped = threading.Event()
+        self.pending = {}  # Poll backend: path -> (root path, last size) until it stops growing
+
+        self.libc = load_inotify() if backend in ('auto', 'inotify') else None
+        if backend == 'inotify' and not self.libc:
+            print("inotify not available - polling the library instead")
+        self.fd = None
+        self.watches = {}  # wd -> (root, folder)
+        self.folder_wds = {}  # folder -> wd
+
+    def start(self):
+        threading.Thread(target=self.run, name='library-watcher', daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def drain(self, limit=WATCH_BATCH):
+        """Queued changes, oldest first (at most limit per call)"""
+        events = []
+        try:
+            while len(events) < limit:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def run(self):
+        try:
+            if self.libc:
+                self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+                if self.fd < 0:
+                    print(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())} - polling instead")
+                    self.fd = None
+
+            if self.fd is not None:
+                for root in self.roots:
+                    for folder in list(root['folders']):
+                        self.add_watch(root, folder)
+
+            print(f"Watching {len(self.roots)} library roots ({'inotify' if self.fd is not None else 'polling'})")
+            self.catch_up()
+
+            if self.fd is not None:
+                self.run_inotify()
+            else:
+                self.run_poll()
+        except Exception as e:
+            print(f"Library watcher stopped: {e}")
+
+    # --- Folder bookkeeping (both backends) ---
+
+    def catch_up(self):
+        """List the folders that changed since the startup scan"""
+        for root in self.roots:
+            for folder in list(root['folders']):
+                if folder not in root['folders']:
+                    continue  # Dropped with its parent
+                try:
+                    stat = os.stat(folder)
+                except OSError:
+                    self.forget_folder(root, folder)
+                    continue
+                root['mtimes'][folder] = stat.st_mtime_ns
+                if stat.st_mtime >= root['scanned_at'] - MTIME_SLACK:
+                    self.refresh_folder(root, folder)
+
+    def list_folder(self, folder):
+        """(media file names, subfolders) of a folder, or (None, []) if it's gone"""
+        names = set()
+        subfolders = []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            if is_media_filename(entry.name):
+                                names.add(entry.name)
+                        elif entry.is_dir(follow_symlinks=False):
+                            subfolders.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            return None, []
+        return names, subfolders
+
+    def refresh_folder(self, root, folder):
+        """List a folder again and queue the difference; new subfolders are walked too"""
+        if folder not in root['folders'] and self.fd is not None:
+            self.add_watch(root, folder)  # Before listing, so nothing slips in between
+
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            mtime = None
+        names, subfolders = self.list_folder(folder)
+        if names is None:
+            self.forget_folder(root, folder)
+            return
+
+        root['mtimes'][folder] = mtime
+        known = root['folders'].get(folder, set())
+        for name in names - known:
+            path = os.path.join(folder, name)
+            if self.fd is None:
+                self.pending[path] = (root['path'], -1)
+            else:
+                self.events.put(('add', root['path'], path))
+        for name in known - names:
+            self.events.put(('remove', root['path'], os.path.join(folder, name)))
+        root['folders'][folder] = names
+
+        for subfolder in subfolders:
+            if (subfolder not in root['folders']
+                    and os.path.normcase(os.path.abspath(subfolder)) not in root['skip']):
+                self.refresh_folder(root, subfolder)
+
+    def forget_folder(self, root, folder):
+        """A folder is gone (or renamed): everything below it is removed"""
+        prefix = folder + os.sep
+        for known in [f for f in root['folders'] if f == folder or f.startswith(prefix)]:
+            for name in root['folders'].pop(known):
+                self.events.put(('remove', root['path'], os.path.join(known, name)))
+            root['mtimes'].pop(known, None)
+
+            wd = self.folder_wds.pop(known, None)
+            if wd is not None:
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    # --- Polling backend ---
+
+    def run_poll(self):
+        while not self.stopped.wait(WATCH_POLL_SECONDS):
+            for root in self.roots:
+                for folder in list(root['folders']):
+                    if folder not in root['folders']:
+                        continue
+                    try:
+                        mtime = os.stat(folder).st_mtime_ns
+                    except OSError:
+                        self.forget_folder(root, folder)
+                        continue
+                    if mtime != root['mtimes'].get(folder):
+                        self.refresh_folder(root, folder)
+            self.settle_pending()
+
+    def settle_pending(self):
+        """Report new files whose size didn't change since the last poll"""
+        for path, (root_path, size) in list(self.pending.items()):
+            try:
+                current = os.stat(path).st_size
+            except OSError:
+                del self.pending[path]  # Gone again (temp file, cancelled download)
+                continue
+            if current == size:
+                del self.pending[path]
+                self.events.put(('add', root_path, path))
+            else:
+                self.pending[path] = (root_path, current)
+
+    # --- inotify backend ---
+
+    def add_watch(self, root, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            print(f"Cannot watch {folder}: {os.strerror(ctypes.get_errno())}")
+            return
+        self.watches[wd] = (root, folder)
+        self.folder_wds[folder] = wd
+
+    def run_inotify(self):
+        try:
+            while not self.stopped.is_set():
+                ready, _, _ = select.select([self.fd], [], [], 1.0)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self.fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self.handle_events(data)
+        finally:
+            os.close(self.fd)
+
+    def handle_events(self, data):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            start = offset + EVENT_HEADER.size
+            name = os.fsdecode(data[start:start + length].rstrip(b'\0'))
+            offset = start + length
+
+            if mask & IN_Q_OVERFLOW:
+                # The kernel dropped events - list every folder again
+                print("Library watcher: event queue overflowed, re-listing folders")
+                for root in self.roots:
+                    for folder in list(root['folders']):
+                        if folder in root['folders']:
+                            self.refresh_folder(root, folder)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            root, folder = self.watches.get(wd, (None, None))
+            if root is None or folder not in root['folders']:
+                continue
+            if mask & IN_DELETE_SELF:
+                self.forget_folder(root, folder)
+                continue
+
+            path = os.path.join(folder, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if os.path.normcase(os.path.abspath(path)) not in root['skip']:
+                        self.refresh_folder(root, path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.forget_folder(root, path)
+            elif is_media_filename(name):
+                names = root['folders'][folder]
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    names.add(name)
+                    self.events.put(('add', root['path'], path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    names.discard(name)
+                    self.events.put(('remove', root['path'], path))
@@ -0,0 +1,26 @@
+import os
+from config import *
+from core.database import Database
+from core.sqlite_store import SqliteDatabase
+
+def import_database():
+    print("=== IMPORTING JSON RATINGS INTO SQLITE ===")
+    print(f"{POINTS_FILE} + {NICE_FILE} -> {DATABASE_SQLITE_FILE}")
+    
+    # Loads the snapshots and replays the journal
+    json_db = Database()
+    print(f"\nLoaded {len(json_db.points_db)} points and {len(json_db.nice_db)} nice entries")
+    
+    existed = os.path.exists(DATABASE_SQLITE_FILE)
+    sqlite_db = SqliteDatabase()
+    if existed:
+        # A new database file imports on open, an existing one needs it explicitly
+        sqlite_db.import_ratings(json_db.points_db, json_db.nice_db, json_db.schema_version())
+        sqlite_db.migrate_to_post_based()
+    
+    json_db.close()
+    sqlite_db.close()
+    print("\nDone! Set DATABASE_BACKEND = 'sqlite' in config.py to use it.")
+
+if __name__ == "__main__":
+    import_database()
@@ -0,0 +1,20 @@
+import sys
+from config import *
+from core.ingest import IngestPipeline
+from core.video_proxy import ProxyBuilder
+
+def ingest(staging=INGEST_STAGING_FOLDER):
+    print("=== INGESTING STAGING FOLDER ===")
+    # Files are moved either way, but thumbnails are only packed if the viewer isn't
+    # running (it holds the packs) - or set INGEST_BACKGROUND to let the viewer ingest
+    pipeline = IngestPipeline(staging)
+    pipeline.run()
+
+    if pipeline.heavy_videos and INGEST_BUILD_PROXIES:
+        ProxyBuilder().build(pipeline.heavy_videos)
+
+    pipeline.thumbnail_cache.pack.close()
+    print("\nDone!")
+
+if __name__ == "__main__":
+    ingest(sys.argv[1] if len(sys.argv) > 1 else INGEST_STAGING_FOLDER)
@@ -0,0 +1,88 @@
+import os
+import sys
+from config import *
+from core.file_manager import scan_tree, library_path, is_media_filename, move_with_sidecars
+
+def plan_moves(root, other_roots, layout):
+    """
+    (src, dst) for every file of a root that isn't where the layout puts it,
+    and the number of media files in the root
+    """
+    skip = {os.path.normcase(os.path.abspath(path)) for path in other_roots}
+    moves = []
+    total = 0
+    for entry in scan_tree(root, skip):
+        name = entry.name
+        if not is_media_filename(name):
+            continue
+        total += 1
+        dst = library_path(root, name, layout)
+        if os.path.normcase(os.path.abspath(entry.path)) != os.path.normcase(os.path.abspath(dst)):
+            moves.append((entry.path, dst))
+    return moves, total
+
+def remove_empty_folders(root, other_roots):
+    """Drop shard folders left empty after flattening"""
+    skip = {os.path.normcase(os.path.abspath(path)) for path in other_roots}
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False) and os.path.normcase(os.path.abspath(entry.path)) not in skip:
+            try:
+                os.rmdir(entry.path)
+            except OSError:
+                pass  # Not empty - not ours
+
+def shard_library(layout='sharded', dry_run=False):
+    print(f"=== CONVERTING LIBRARY TO {layout.upper()} LAYOUT ===")
+    if dry_run:
+        print("Dry run - nothing is moved")
+
+    root_paths = [root['path'] for root in LIBRARY_ROOTS]
+    for root in LIBRARY_ROOTS:
+        path = root['path']
+        if root.get('read_only', False):
+            print(f"\n{path}: read-only, skipped")
+            continue
+        if not os.path.exists(path):
+            print(f"\n{path}: does not exist, skipped")
+            continue
+
+        others = [p for p in root_paths if p != path]
+        moves, total = plan_moves(path, others, layout)
+        print(f"\n{path}: {len(moves)} of {total} files to move")
+
+        moved = 0
+        skipped = 0
+        for src, dst in moves:
+            if os.path.exists(dst):
+                print(f"  Already exists, skipped: {dst}")
+                skipped += 1
+                continue
+            if dry_run:
+                continue
+            try:
+                move_with_sidecars(src, dst)  # Same drive - a rename, no copy
+                moved += 1
+            except OSError as e:
+                print(f"  Error moving {src}: {e}")
+                skipped += 1
+
+            if moved and moved % 10000 == 0:
+                print(f"  {moved}/{len(moves)} moved")
+
+        if layout == 'flat' and not dry_run:
+            remove_empty_folders(path, others)
+        print(f"  Moved {moved}, skipped {skipped}")
+
+        if not dry_run:
+            # Sanity check: every file is still there, and only the skipped ones are misplaced
+            left, total_after = plan_moves(path, others, layout)
+            if total_after != total or len(left) != skipped:
+                print(f"  WARNING: {total_after} files found after moving (was {total}), "
+                      f"{len(left)} still misplaced (expected {skipped})")
+
+    if not dry_run:
+        print(f"\nDone! Set LIBRARY_LAYOUT = '{layout}' in config.py.")
+
+if __name__ == "__main__":
+    layout = 'flat' if '--flatten' in sys.argv else 'sharded'
+    shard_library(layout, dry_run='--dry-run' in sys.argv)
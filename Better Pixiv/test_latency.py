@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import tkinter as tk
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from config import *
+import ui.media_viewer as media_viewer
+from ui.media_viewer import MediaViewer
+from utils.latency_monitor import LatencyMonitor
+
+DECODE_SECONDS = 0.3   # A slow disk or a 4K still
+LOADS = 20             # Navigations, one every NAV_INTERVAL_MS
+NAV_INTERVAL_MS = 100
+
+def slow_decode(file_info):
+    """Stands in for decode_media: sleeps like a slow decode would block"""
+    time.sleep(DECODE_SECONDS)
+    return {'kind': 'image', 'image': Image.new('RGB', (320, 240), '#336699')}
+
+def fake_file(i):
+    return {'filename': f"{100000 + i}_p0.jpg", 'full_path': os.path.join(HERE, f"{100000 + i}_p0.jpg"),
+            'is_video': False, 'is_ugoira': False}
+
+def run_loop(root, seconds, setup):
+    """Run the Tk loop for a while with a LatencyMonitor, returns it"""
+    monitor = LatencyMonitor(root)
+    monitor.start()
+    setup()
+    root.after(int(seconds * 1000), root.quit)
+    root.mainloop()
+    monitor.stop()
+    return monitor
+
+def check_latency():
+    print("=== CHECKING THE TK LOOP STAYS RESPONSIVE WHILE MEDIA LOADS ===")
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"SKIPPED: no display ({e})")
+        return True
+    root.geometry("800x600")
+
+    # Self-check: a stall on the Tk thread has to show up, or the check below proves nothing
+    monitor = run_loop(root, 0.5, lambda: root.after(100, lambda: time.sleep(DECODE_SECONDS)))
+    _, _, worst = monitor.stats()
+    if worst < DECODE_SECONDS * 1000 * 0.8:
+        print(f"FAIL: the monitor missed a {DECODE_SECONDS * 1000:.0f} ms stall (max lag {worst:.0f} ms)")
+        root.destroy()
+        return False
+    print(f"Monitor self-check: {DECODE_SECONDS * 1000:.0f} ms stall seen as {worst:.0f} ms")
+
+    # The real thing: navigations faster than decodes finish, every decode slow
+    media_viewer.decode_media = slow_decode
+    viewer = MediaViewer(root)
+    shown = []
+
+    def navigate(i=0):
+        if i < LOADS:
+            viewer.load_media(fake_file(i), on_done=shown.append)
+            root.after(NAV_INTERVAL_MS, navigate, i + 1)
+
+    seconds = LOADS * NAV_INTERVAL_MS / 1000 + DECODE_SECONDS * 3
+    monitor = run_loop(root, seconds, navigate)
+    avg, p99, worst = monitor.stats()
+    root.destroy()
+
+    expected_ticks = seconds * 1000 / LATENCY_MONITOR_INTERVAL_MS
+    print(f"{LOADS} loads of {DECODE_SECONDS * 1000:.0f} ms each, {len(shown)} shown")
+    print(f"Event loop lag: avg {avg:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms "
+          f"over {len(monitor.lags)} ticks (~{expected_ticks:.0f} expected)")
+
+    ok = True
+    if worst > LATENCY_WARN_MS:
+        print(f"FAIL: the Tk thread was blocked for {worst:.0f} ms (limit {LATENCY_WARN_MS} ms)")
+        ok = False
+    if len(monitor.lags) < expected_ticks / 2:
+        print("FAIL: the Tk loop stopped ticking")
+        ok = False
+    if not shown:
+        print("FAIL: nothing was shown")
+        ok = False
+    print("PASS" if ok else "FAILED")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_latency() else 1)
@@ -1,26 +1,32 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 from config import *
+from ui.hover_preview import HoverPreview
+from ui.thumbnail_service import ThumbnailRequests
 
 class ArtistMenu:
-    def __init__(self, root, on_back, on_work_select):
+    def __init__(self, root, on_back, on_work_select, thumbnails):
         self.root = root
         self.on_back = on_back
         self.on_work_select = on_work_select
+        self.thumbnail_service = thumbnails  # Shared ThumbnailService
         
         self.frame = None
         self.canvas = None
-        self.thumbnail_frame = None
-        self.thumbnails = []
+        self.cells = []
+        self.bound_cells = {}
+        self.cols = 0
         
         # Navigation state
         self.current_artist_id = None
         self.current_works = []
         self.current_index = 0
+        
+        # Muted low-res preview for video tiles
+        self.hover_preview = HoverPreview(root)
     
     def show(self, artist_id, artist_name, works):
-        """Show artist menu WITHOUT scrollbars and WITHOUT back button"""
+        """Show artist menu with a scrollable grid and WITHOUT back button"""
         self.current_artist_id = artist_id
         self.current_works = works
         self.current_index = 0
@@ -42,86 +48,198 @@ class ArtistMenu:
                               bg='#2d2d2d', fg='#aaaaaa')
         count_label.pack()
         
-        # Create thumbnail grid WITHOUT scrollbars
+        # Create virtualized thumbnail grid
         self.create_thumbnail_grid(works)
     
     def create_thumbnail_grid(self, works):
-        """Create grid of artist's works - NO SCROLLBARS, EXPANDED WIDTH"""
-        # Create main container that fills available space
-        self.thumbnail_frame = tk.Frame(self.frame, bg='#2d2d2d')
-        self.thumbnail_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
-        
-        # Calculate grid layout - use more columns for wider display
-        self.thumbnails = []
-        cols = 8  # Increased for better horizontal fill
-        thumb_size = THUMBNAIL_SIZE + 20
+        """
+        Create a virtualized grid of the artist's works on a canvas.
+        Only cells for visible rows (plus overscan) exist; they are
+        recycled while scrolling, so cost does not grow with work count.
+        """
+        self.canvas = tk.Canvas(self.frame, bg='#2d2d2d', highlightthickness=0,
+                                yscrollincrement=GRID_SCROLL_STEP)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
-        # Create thumbnails in grid directly (no canvas)
-        for idx, work in enumerate(works):
-            row = idx // cols
-            col = idx % cols
-            
-            # Create thumbnail frame
-            thumb_frame = tk.Frame(self.thumbnail_frame, bg='#2d2d2d')
-            thumb_frame.grid(row=row, column=col, padx=5, pady=5, sticky='nw')
-            
-            # Load thumbnail
-            thumb_img = self.load_work_thumbnail(work['thumbnail'])
-            
-            # Clickable thumbnail button
-            btn = tk.Button(thumb_frame, image=thumb_img,
-                          command=lambda p=work['post_id']: self.on_work_select(p),
-                          bg='#3d3d3d', relief='flat',
-                          cursor='hand2')
-            btn.image = thumb_img
-            btn.pack()
-            
-            # Page count badge
-            if work.get('page_count', 1) > 1:
-                badge = tk.Label(thumb_frame, 
-                               text=f"{work['page_count']}p",
-                               bg='#f44336', fg='white',
-                               font=('Segoe UI', 8))
-                badge.place(relx=1.0, rely=0.0, anchor='ne')
-            
-            # Work title
-            title = work['thumbnail'].get('title', 'Untitled')
-            if len(title) > 25:
-                title = title[:25] + "..."
+        self.cells = []       # All created cells (pool)
+        self.bound_cells = {} # work index -> cell currently showing it
+        self.cols = 0
+        
+        self.canvas.config(yscrollcommand=lambda first, last: self.refresh_visible())
+        self.canvas.bind('<Configure>', self.on_canvas_resize)
+        
+        # Wheel scrolling anywhere over the grid - cells cover the canvas, so they get it too
+        self.bind_mousewheel(self.canvas)
+    
+    def bind_mousewheel(self, widget):
+        widget.bind('<MouseWheel>', self.on_mousewheel)
+        widget.bind('<Button-4>', self.on_mousewheel)
+        widget.bind('<Button-5>', self.on_mousewheel)
+    
+    def on_canvas_resize(self, event):
+        """Re-flow the column count to the window width"""
+        cols = max(1, event.width // GRID_CELL_WIDTH)
+        if cols != self.cols:
+            self.cols = cols
             
-            title_label = tk.Label(thumb_frame, text=title,
-                                 bg='#2d2d2d', fg='white',
-                                 font=('Segoe UI', 8),
-                                 wraplength=thumb_size)
-            title_label.pack()
+            # Every cell position changes - release them all and lay out again
+            for idx in list(self.bound_cells):
+                self.release_cell(idx)
             
-            self.thumbnails.append({
-                'frame': thumb_frame,
-                'button': btn,
-                'work': work
-            })
-        
-        # Configure grid to expand
-        for i in range(cols):
-            self.thumbnail_frame.columnconfigure(i, weight=1)
-    
-    def load_work_thumbnail(self, thumbnail_info):
-        """Load thumbnail for a work"""
-        from config import FIXED_FOLDER_PATH
-        path = thumbnail_info['full_path']
-        
-        try:
-            if thumbnail_info['filename'].lower().endswith(SUPPORTED_IMAGE_EXTS):
-                img = Image.open(path)
-                img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
-                return ImageTk.PhotoImage(img)
-        except:
-            pass
-        
-        # Fallback thumbnail
-        return ImageTk.PhotoImage(
-            Image.new('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE), '#3d3d3d')
-        )
+            rows = (len(self.current_works) + cols - 1) // cols
+            self.canvas.config(scrollregion=(0, 0, cols * GRID_CELL_WIDTH, rows * GRID_CELL_HEIGHT))
+        
+        self.refresh_visible()
+    
+    def on_mousewheel(self, event):
+        """Scroll the grid"""
+        if not self.canvas:
+            return
+        
+        if getattr(event, 'num', None) == 4:
+            steps = -GRID_WHEEL_STEPS
+        elif getattr(event, 'num', None) == 5:
+            steps = GRID_WHEEL_STEPS
+        else:
+            steps = -GRID_WHEEL_STEPS if event.delta > 0 else GRID_WHEEL_STEPS
+        
+        self.canvas.yview_scroll(steps, 'units')
+    
+    def visible_range(self):
+        """Work indices in the visible rows plus overscan"""
+        if not self.cols:
+            return range(0)
+        
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        
+        first_row = max(0, int(top // GRID_CELL_HEIGHT) - GRID_OVERSCAN_ROWS)
+        last_row = int(bottom // GRID_CELL_HEIGHT) + GRID_OVERSCAN_ROWS
+        
+        return range(first_row * self.cols,
+                     min(len(self.current_works), (last_row + 1) * self.cols))
+    
+    def refresh_visible(self):
+        """Bind cells to the visible works and recycle the rest"""
+        if not self.canvas or not self.cols:
+            return
+        
+        visible = self.visible_range()
+        
+        for idx in list(self.bound_cells):
+            if idx not in visible:
+                self.release_cell(idx)
+        
+        for idx in visible:
+            if idx not in self.bound_cells:
+                self.bind_cell(idx)
+    
+    def create_cell(self):
+        """Create one reusable grid cell"""
+        thumb_size = THUMBNAIL_SIZE + 20
+        
+        frame = tk.Frame(self.canvas, bg='#2d2d2d',
+                         width=GRID_CELL_WIDTH - 10, height=GRID_CELL_HEIGHT - 10)
+        frame.pack_propagate(False)
+        
+        btn = tk.Button(frame, bg='#3d3d3d', relief='flat', cursor='hand2')
+        btn.pack()
+        
+        badge = tk.Label(frame, bg='#f44336', fg='white', font=('Segoe UI', 8))
+        
+        title_label = tk.Label(frame, bg='#2d2d2d', fg='white',
+                               font=('Segoe UI', 8),
+                               wraplength=thumb_size)
+        title_label.pack()
+        
+        cell = {
+            'frame': frame,
+            'button': btn,
+            'badge': badge,
+            'title': title_label,
+            'window': self.canvas.create_window(0, 0, window=frame, anchor='nw'),
+            'idx': None,
+            'requests': ThumbnailRequests()
+        }
+        
+        # Hovering a video tile plays a tiny preview in place
+        btn.bind('<Enter>', lambda e, c=cell: self.on_cell_enter(c))
+        btn.bind('<Leave>', lambda e: self.hover_preview.stop())
+        
+        for widget in (frame, btn, badge, title_label):
+            self.bind_mousewheel(widget)
+        
+        self.cells.append(cell)
+        return cell
+    
+    def bind_cell(self, idx):
+        """Show works[idx] in a free (or new) cell"""
+        cell = next((c for c in self.cells if c['idx'] is None), None) or self.create_cell()
+        work = self.current_works[idx]
+        
+        cell['idx'] = idx
+        self.bound_cells[idx] = cell
+        
+        # Position
+        row, col = divmod(idx, self.cols)
+        self.canvas.coords(cell['window'], col * GRID_CELL_WIDTH + 5, row * GRID_CELL_HEIGHT + 5)
+        self.canvas.itemconfigure(cell['window'], state='normal')
+        
+        # Thumbnail - placeholder until decoded
+        btn = cell['button']
+        thumb_img = self.thumbnail_service.peek(work['thumbnail']) or self.thumbnail_service.fallback()
+        btn.config(image=thumb_img, command=lambda p=work['post_id']: self.on_work_select(p))
+        btn.image = thumb_img
+        
+        cell['requests'] = ThumbnailRequests()
+        self.thumbnail_service.load_async(work['thumbnail'],
+                                          lambda photo, c=cell, i=idx: self.set_thumbnail(c, i, photo),
+                                          cell['requests'])
+        
+        # Page count badge
+        if work.get('page_count', 1) > 1:
+            cell['badge'].config(text=f"{work['page_count']}p")
+            cell['badge'].place(relx=1.0, rely=0.0, anchor='ne')
+        else:
+            cell['badge'].place_forget()
+        
+        # Work title
+        title = work['thumbnail'].get('title', 'Untitled')
+        if len(title) > 25:
+            title = title[:25] + "..."
+        cell['title'].config(text=title)
+    
+    def release_cell(self, idx):
+        """Return a cell to the pool"""
+        cell = self.bound_cells.pop(idx)
+        cell['requests'].cancel()
+        if self.hover_preview.button is cell['button']:
+            self.hover_preview.stop()
+        
+        cell['idx'] = None
+        self.canvas.itemconfigure(cell['window'], state='hidden')
+    
+    def set_thumbnail(self, cell, idx, photo):
+        """Swap a placeholder for its decoded thumbnail"""
+        if cell['idx'] != idx:
+            return  # Cell was recycled
+        
+        btn = cell['button']
+        btn.image = photo
+        if self.hover_preview.button is btn:
+            # Preview is playing in this tile - restore to the real thumbnail later
+            self.hover_preview.original_image = photo
+        else:
+            btn.config(image=photo)
+    
+    def on_cell_enter(self, cell):
+        """Start hover preview if the cell shows a video"""
+        if cell['idx'] is None:
+            return
+        
+        thumbnail = self.current_works[cell['idx']]['thumbnail']
+        if thumbnail.get('is_video') and not thumbnail.get('archive'):
+            self.hover_preview.start(cell['button'], thumbnail['full_path'])
     
     def next_work(self):
         """Navigate to next work in artist mode"""
@@ -139,13 +257,18 @@ class ArtistMenu:
     
     def hide(self):
         """Hide artist menu"""
+        for cell in self.cells:
+            cell['requests'].cancel()
+        self.hover_preview.stop()
+        
         if self.frame and self.frame.winfo_exists():
             self.frame.destroy()
         
         self.frame = None
         self.canvas = None
-        self.thumbnail_frame = None
-        self.thumbnails = []
+        self.cells = []
+        self.bound_cells = {}
+        self.cols = 0
     
     def is_visible(self):
         """Check if artist menu is visible"""
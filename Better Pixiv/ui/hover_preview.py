@@ -0,0 +1,152 @@
+import threading
+import time
+import cv2
+from PIL import Image, ImageTk
+from config import *
+from core.video_proxy import get_proxy_path
+
+class DecoderBudget:
+    """Shared limit on how many hover decoders may run at once"""
+
+    def __init__(self, max_active=HOVER_MAX_DECODERS):
+        self.max_active = max_active
+        self.active = []  # Previews that currently own a decoder slot
+        self.lock = threading.Lock()
+
+    def acquire(self, preview):
+        """Take a slot, evicting the oldest preview if the budget is full"""
+        evicted = []
+        with self.lock:
+            while len(self.active) >= self.max_active:
+                evicted.append(self.active.pop(0))
+            self.active.append(preview)
+
+        for old in evicted:
+            old.stop()
+
+    def release(self, preview):
+        with self.lock:
+            if preview in self.active:
+                self.active.remove(preview)
+
+# One budget for the whole app
+hover_budget = DecoderBudget()
+
+class HoverPreview:
+    """Muted, thumbnail-sized video preview played inside a tile while hovered"""
+
+    def __init__(self, root, size=THUMBNAIL_SIZE, budget=hover_budget):
+        self.root = root
+        self.size = size
+        self.budget = budget
+
+        self.generation = 0  # Bumped on every start/stop so stale frames are dropped
+        self.button = None
+        self.original_image = None
+        self.tk_frame = None
+
+    def start(self, button, path):
+        """Start previewing a video in the given tile button"""
+        self.stop()
+        self.budget.acquire(self)
+
+        self.generation += 1
+        self.button = button
+        self.original_image = button.image
+
+        # Proxies decode much faster than 4K originals
+        source = get_proxy_path(path) or path
+        thread = threading.Thread(target=self.decode_thread,
+                                  args=(source, self.generation), daemon=True)
+        thread.start()
+
+    def stop(self):
+        """Cancel the preview immediately and restore the static thumbnail"""
+        self.generation += 1
+        self.budget.release(self)
+
+        if self.button is not None:
+            try:
+                if self.button.winfo_exists():
+                    self.button.config(image=self.original_image)
+            except Exception:
+                pass
+
+        self.button = None
+        self.original_image = None
+        self.tk_frame = None
+
+    def decode_thread(self, path, generation):
+        """
+        Decode frames at reduced rate until cancelled, scaled down to the tile.
+
+        OpenCV can't decode at a reduced resolution, so every frame costs a
+        full-size decode. Videos larger than the proxy box (no proxy built
+        yet) are therefore skimmed: a seek every HOVER_SKIM_SECONDS instead
+        of grabbing every frame, at HOVER_SKIM_FPS.
+        """
+        cap = cv2.VideoCapture(path)
+        try:
+            if not cap.isOpened():
+                return
+
+            video_fps = cap.get(cv2.CAP_PROP_FPS) or VIDEO_FPS
+            skim = (cap.get(cv2.CAP_PROP_FRAME_WIDTH) > PROXY_MAX_WIDTH
+                    or cap.get(cv2.CAP_PROP_FRAME_HEIGHT) > PROXY_MAX_HEIGHT)
+            if skim:
+                frame_skip = max(1, int(round(video_fps * HOVER_SKIM_SECONDS)))
+                frame_delay = 1.0 / HOVER_SKIM_FPS
+            else:
+                frame_skip = max(1, int(round(video_fps / HOVER_PREVIEW_FPS)))
+                frame_delay = frame_skip / video_fps
+            position = 0
+            rewound = False
+
+            while generation == self.generation:
+                start = time.time()
+
+                if skim:
+                    # Decodes from the keyframe before position, not every frame since the last one
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+                    position += frame_skip
+                else:
+                    # grab() skips frames without the cost of converting them
+                    for _ in range(frame_skip - 1):
+                        cap.grab()
+                ret, frame = cap.read()
+                if not ret:
+                    if rewound:
+                        break  # Nothing decodable even from the start - keep the thumbnail
+                    # Loop
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = 0
+                    rewound = True
+                    continue
+                rewound = False
+
+                h, w = frame.shape[:2]
+                scale = self.size / max(w, h)
+                frame = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                   interpolation=cv2.INTER_AREA)
+                img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+                if generation != self.generation:
+                    break
+                self.root.after(0, lambda i=img: self.show_frame(i, generation))
+
+                time.sleep(max(0, frame_delay - (time.time() - start)))
+        except Exception as e:
+            print(f"Hover preview error: {e}")
+        finally:
+            cap.release()
+
+    def show_frame(self, img, generation):
+        """Apply a decoded frame to the tile (Tk thread)"""
+        if generation != self.generation or self.button is None:
+            return
+        if not self.button.winfo_exists():
+            self.stop()
+            return
+
+        self.tk_frame = ImageTk.PhotoImage(img)
+        self.button.config(image=self.tk_frame)
@@ -1,15 +1,24 @@
 import tkinter as tk
+import time
 from tkinter import ttk
 from config import *
 from core.file_manager import FileManager
-from core.database import Database
+from core.database import open_database
 from core.state_manager import AppState
+from core.sort_index import BrowseIndexes
+from core.smart_shuffle import SmartShuffle
+from core.random_order import RandomOrder
+from core.session import load_session, save_session
+from core.prefetch import Prefetcher
+from core.watcher import LibraryWatcher
+from core.ingest import IngestPipeline
 from ui.media_viewer import MediaViewer
 from ui.sidebar import Sidebar
 from ui.artist_menu import ArtistMenu
 from ui.controls import ControlPanel
+from ui.thumbnail_service import ThumbnailService
 from ui.styles import ModernStyle
-import random
+from utils.latency_monitor import LatencyMonitor
 
 class MainWindow:
     def __init__(self, root):
@@ -18,25 +27,49 @@ class MainWindow:
         
         # Core components
         self.file_manager = FileManager()
-        self.database = Database()
+        self.database = open_database()
         self.state = AppState()
         
         # Navigation system
-        self.random_list = []
+        self.random_order = None
         self.current_random_index = 0
         
+        # Sorted browse orders (indexes follow rating changes)
+        self.browse = BrowseIndexes(self.file_manager, self.database,
+                                    call_soon=lambda fn: self.root.after(0, fn))
+        self.database.add_listener(self.browse.on_ratings_changed)
+        self.shuffle = SmartShuffle(self.file_manager, self.database)
+        self.database.add_listener(self.shuffle.on_ratings_changed)
+        self.browse_order = 'random'
+        self.browse_position = 0
+        
+        # Held-key navigation: only the post the user settles on is fully loaded
+        self.last_nav_time = 0
+        self.settle_after_id = None
+        
         # Track modes
         self.in_artist_menu = False
         self.back_button = None
         
+        # Last session: random order, mode, artist and history
+        self.session = load_session() if RESTORE_SESSION else {}
+        self.state.history.load(self.session.get('history', {}))
+        
         # Generate random list
         self.generate_random_list()
         
         # UI components
         self.style = ModernStyle(root)
+        self.thumbnails = ThumbnailService(root)  # Shared by sidebar and artist menu
+        
+        # Start reading the restored neighbourhood while the rest of the UI is built
+        self.prefetcher = Prefetcher()
+        self.prefetch_neighbourhood(self.session.get('post_id'))
+        
         self.media_viewer = MediaViewer(root, self)  # Pass self as second argument
-        self.sidebar = Sidebar(root, self.on_page_select, self.on_page_delete)
-        self.artist_menu = ArtistMenu(root, self.on_back_from_artist, self.on_artist_work_select)
+        self.sidebar = Sidebar(root, self.on_page_select, self.on_page_delete, self.thumbnails)
+        self.artist_menu = ArtistMenu(root, self.on_back_from_artist, self.on_artist_work_select,
+                                      self.thumbnails)
         
         # Control panel
         self.controls = ControlPanel(
@@ -51,6 +84,30 @@ class MainWindow:
         # Bind shortcuts BEFORE loading first media
         self.bind_shortcuts()
         
+        # Save pending ratings when the window is closed
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        
+        # Debug: watch for handlers that block the UI thread
+        self.latency_monitor = None
+        if LATENCY_MONITOR:
+            self.latency_monitor = LatencyMonitor(root)
+            self.latency_monitor.start()
+        
+        # Pick up downloads and outside deletes while running
+        self.watcher = None
+        if WATCH_LIBRARY:
+            self.watcher = LibraryWatcher(self.file_manager)
+            self.watcher.start()
+        
+        # Move new downloads in from the staging folder, thumbnails ready when they show up
+        self.ingest = None
+        if INGEST_BACKGROUND and INGEST_STAGING_FOLDER:
+            self.ingest = IngestPipeline(thumbnail_cache=self.thumbnails.disk_cache)
+            self.ingest.start_background(self.file_manager)
+        
+        if self.watcher or self.ingest:
+            self.root.after(WATCH_APPLY_MS, self.apply_library_changes)
+        
         # Load first media AFTER UI is ready
         self.root.after(100, self.load_first_media)
     
@@ -61,9 +118,30 @@ class MainWindow:
         self.root.minsize(800, 600)
         self.root.configure(bg='black')
     
+    def on_close(self):
+        """Save the session, flush the database and quit"""
+        if self.latency_monitor:
+            self.latency_monitor.report()
+        if DEBUG_MODE:
+            self.prefetcher.report()
+        if self.watcher:
+            self.watcher.stop()
+        if self.ingest:
+            self.ingest.stop()
+        # Whatever fails here, the window still closes
+        try:
+            save_session(self.session_state())
+        except Exception as e:
+            print(f"Error saving session: {e}")
+        try:
+            self.database.close()
+        except Exception as e:
+            print(f"Error saving ratings: {e}")
+        self.root.quit()
+    
     def bind_shortcuts(self):
         """Bind keyboard shortcuts"""
-        self.root.bind('<Escape>', lambda e: self.root.quit())
+        self.root.bind('<Escape>', lambda e: self.on_close())
         self.root.bind('<space>', self.handle_spacebar)
         self.root.bind('<Right>', lambda e: self.handle_right_arrow())
         self.root.bind('<Left>', lambda e: self.handle_left_arrow())
@@ -72,6 +150,9 @@ class MainWindow:
         self.root.bind('+', lambda e: self.media_viewer.zoom_in())
         self.root.bind('-', lambda e: self.media_viewer.zoom_out())
         self.root.bind('0', lambda e: self.media_viewer.reset_zoom())
+        self.root.bind('o', lambda e: self.cycle_browse_order())
+        self.root.bind('<Alt-Left>', lambda e: self.go_back())
+        self.root.bind('<Alt-Right>', lambda e: self.go_forward())
     
     def handle_spacebar(self, event):
         """Handle spacebar without triggering buttons"""
@@ -82,56 +163,213 @@ class MainWindow:
         self.media_viewer.toggle_video_playback()
     
     def generate_random_list(self):
-        """Generate fixed random list at startup"""
+        """Set up the random order at startup (same seed as last time, if saved)"""
         if self.file_manager.all_posts:
-            all_posts = list(self.file_manager.all_posts.keys())
-            random.shuffle(all_posts)
-            self.random_list = all_posts
-            self.current_random_index = 0
-            print(f"Generated random list with {len(self.random_list)} posts")
+            self.random_order = RandomOrder(self.file_manager.all_posts.keys(), self.session.get('seed'))
+            self.current_random_index = self.session.get('position', 0) % len(self.random_order.posts)
+            print(f"Random order over {len(self.random_order)} posts (seed {self.random_order.seed})")
+    
+    def apply_library_changes(self):
+        """Fold files that came and went (watcher, ingest) into the library and every index"""
+        events = []
+        if self.watcher:
+            events += self.watcher.drain()
+        if self.ingest:
+            events += self.ingest.drain()
+        if events:
+            changed = set()
+            for kind, root_path, path in events:
+                if kind == 'add':
+                    post_id = self.file_manager.add_file(path, root_path)
+                else:
+                    post_id = self.file_manager.remove_path(path)
+                if post_id:
+                    changed.add(post_id)
+            
+            # Rewritten files keep their path - drop what was cached for them
+            paths = {path for _, _, path in events}
+            self.thumbnails.forget(paths)
+            self.prefetcher.forget(paths)
+            
+            if changed:
+                self.on_library_changed(changed)
+        
+        self.root.after(WATCH_APPLY_MS, self.apply_library_changes)
+    
+    def on_library_changed(self, post_ids):
+        """Posts gained or lost files outside the app"""
+        for post_id in post_ids:
+            self.browse.on_post_changed(post_id)
+            self.shuffle.on_post_changed(post_id)
+        
+        live = [post_id for post_id in post_ids if post_id in self.file_manager.all_posts]
+        print(f"Library changed: {len(post_ids)} posts updated, {len(self.file_manager.all_posts)} posts")
+        
+        if not self.random_order:
+            # Library was empty at startup
+            self.generate_random_list()
+            if self.random_order:
+                self.load_random_position(self.current_random_index)
+            return
+        
+        for post_id in post_ids:
+            if post_id not in self.file_manager.all_posts:
+                self.random_order.remove(post_id)
+        self.random_order.add(live)
+        position = self.random_order.position(self.state.current_post_id)
+        if position is not None:
+            self.current_random_index = position
+        
+        current = self.state.current_post_id
+        if current in post_ids and not self.in_artist_menu:
+            if current in self.file_manager.all_posts:
+                # Pages came or went - show the new page list
+                self.load_work(current, self.state.current_page_idx)
+            elif self.file_manager.all_posts:
+                self.load_random_position(self.current_random_index)
+    
+    def session_state(self):
+        """Everything needed to resume where we left off"""
+        session = {
+            'post_id': self.state.current_post_id,
+            'page_idx': self.state.current_page_idx,
+            'mode': self.state.mode,
+            'artist_id': self.state.current_artist_id,
+            'artist_work_index': self.state.artist_work_index,
+            'browse_order': self.browse_order,
+            'history': self.state.history.to_dict()
+        }
+        if self.random_order:
+            session['seed'] = self.random_order.seed
+            session['position'] = self.current_random_index
+        return session
+    
+    def restore_session(self):
+        """Reopen the last post with its mode and artist context"""
+        post_id = self.session.get('post_id')
+        if post_id not in self.file_manager.all_posts:
+            return False
+        
+        print(f"\nRestoring last session: post {post_id}")
+        if self.session.get('browse_order') in BROWSE_ORDERS:
+            self.browse_order = self.session['browse_order']
+            self.root.title(f"Pixiv Offline Viewer - {self.browse_order}")
+        
+        artist_id = self.session.get('artist_id')
+        if self.session.get('mode') == 'artist' and artist_id:
+            works = self.file_manager.get_artist_works(artist_id)
+            if works:
+                self.state.set_artist_mode(artist_id, works)
+                self.state.artist_work_index = min(self.session.get('artist_work_index', 0), len(works) - 1)
+        
+        self.load_work(post_id, self.session.get('page_idx', 0))
+        return True
+    
+    def upcoming_posts(self, count):
+        """The next posts Right would show in the current mode"""
+        if self.state.mode == 'artist' and self.state.artist_works:
+            works = self.state.artist_works
+            return [works[(self.state.artist_work_index + d) % len(works)]['post_id']
+                    for d in range(1, count + 1)]
+        
+        if self.browse_order not in ('random', 'shuffle'):
+            index = self.browse.get(self.browse_order)
+            position = index.position(self.state.current_post_id) if index else None
+            if position is None or not len(index):
+                return []
+            return [index.post_at((position + d) % len(index)) for d in range(1, count + 1)]
+        
+        if self.random_order and self.browse_order == 'random':
+            return [self.random_order.post_at(self.current_random_index + d)[1]
+                    for d in range(1, count + 1)]
+        return []
+    
+    def prefetch_neighbourhood(self, post_id=None):
+        """Warm the files of the posts around the current one, most likely next first"""
+        pages = list(self.file_manager.get_post_files(post_id)) if post_id else []
+        if post_id == self.state.current_post_id and pages:
+            # Drop the page on screen; the one after it comes first
+            idx = self.state.current_page_idx
+            pages = pages[idx + 1:] + pages[:idx]
+        
+        post_ids = self.upcoming_posts(PREFETCH_RADIUS) + self.state.history.neighbours(PREFETCH_RADIUS)
+        if self.random_order and self.browse_order == 'random':
+            for distance in range(1, PREFETCH_RADIUS + 1):
+                post_ids.append(self.random_order.post_at(self.current_random_index - distance, -1)[1])
+        
+        others = []
+        for pid in dict.fromkeys(post_ids):
+            if pid and pid != post_id:
+                others += self.file_manager.get_post_files(pid)[:1]
+        
+        # Next page, then the next posts, then the remaining pages and neighbours
+        files = pages[:1] + others[:PREFETCH_RADIUS] + pages[1:] + others[PREFETCH_RADIUS:]
+        self.prefetcher.warm(files)
+        self.thumbnails.warm(files)
+    
+    def go_back(self):
+        """Previous post in the navigation history"""
+        self.walk_history(self.state.history.back)
+    
+    def go_forward(self):
+        """Next post in the navigation history"""
+        self.walk_history(self.state.history.forward)
+    
+    def walk_history(self, step):
+        if self.in_artist_menu:
+            return
+        post_id = step()
+        # Skip posts deleted since they were visited
+        while post_id and post_id not in self.file_manager.all_posts:
+            post_id = step()
+        if post_id:
+            self.load_work(post_id)
+    
+    def load_random_position(self, position, direction=1):
+        """Load the first live post at (or past) a position of the random order"""
+        position, post_id = self.random_order.post_at(position, direction)
+        if post_id:
+            self.current_random_index = position
+            self.load_work(post_id)
     
     def load_first_media(self):
-        """Load first media - ENFORCE VIDEO-FIRST RULE"""
+        """Load first media - resume the last session, else ENFORCE VIDEO-FIRST RULE"""
         print("\n" + "="*60)
         print("LOADING FIRST MEDIA")
         print("="*60)
         
-        if not self.random_list:
+        if not self.random_order:
             print("ERROR: No files found!")
             return
         
+        if self.restore_session():
+            return
+        
         # Get ALL video posts
-        video_posts = self.file_manager.get_video_posts()
+        video_posts = set(self.file_manager.get_video_posts())
         print(f"\nVideo posts from file manager: {len(video_posts)}")
         
         if video_posts:
-            print(f"\nLooking for videos in random list...")
-            print(f"Random list has {len(self.random_list)} posts")
+            print(f"\nLooking for videos in random order...")
+            print(f"Random order has {len(self.random_order)} posts")
             
-            # Find ALL videos in random list
-            video_indices = []
-            for i, post_id in enumerate(self.random_list):
+            # Walk the order from the saved position to the first video
+            start = self.current_random_index
+            for offset in range(len(self.random_order.posts)):
+                position = (start + offset) % len(self.random_order.posts)
+                post_id = self.random_order.posts[self.random_order.perm.forward(position)]
                 if post_id in video_posts:
-                    video_indices.append(i)
+                    self.current_random_index = position
+                    print(f"\n✓ Loading video: {post_id} (index {position})")
+                    self.load_work(post_id)
+                    return
             
-            if video_indices:
-                # Pick first video in random list
-                first_video_index = video_indices[0]
-                self.current_random_index = first_video_index
-                post_id = self.random_list[first_video_index]
-                
-                print(f"\n✓ Loading video: {post_id} (index {first_video_index})")
-                self.load_work(post_id)
-                return
-            else:
-                print("\n⚠ WARNING: Video posts exist but none found in random list!")
-                print("This means random list was generated before videos were loaded.")
+            print("\n⚠ WARNING: Video posts exist but none found in random order!")
         else:
             print("\nNo video posts found (0 videos in database)")
         
-        # Fallback: Load first random post
-        print(f"\nLoading first random post: {self.random_list[0]}")
-        self.load_work(self.random_list[0])
+        # Fallback: Load the random post at the saved position
+        self.load_random_position(self.current_random_index)
     
     def handle_right_arrow(self):
         """Right arrow - next in current mode"""
@@ -144,13 +382,14 @@ class MainWindow:
             if next_post_id:
                 self.load_work(next_post_id)
             return
+        elif self.browse_order != 'random':
+            self.step_browse_order(1)
         else:
             # Random mode
-            if not self.random_list:
+            if not self.random_order:
                 return
             
-            self.current_random_index = (self.current_random_index + 1) % len(self.random_list)
-            self.load_work(self.random_list[self.current_random_index])
+            self.load_random_position(self.current_random_index + 1, 1)
     
     def handle_left_arrow(self):
         """Left arrow - previous in current mode"""
@@ -163,26 +402,109 @@ class MainWindow:
             if prev_post_id:
                 self.load_work(prev_post_id)
             return
+        elif self.browse_order != 'random':
+            self.step_browse_order(-1)
         else:
             # Random mode
-            if not self.random_list:
+            if not self.random_order:
                 return
             
-            self.current_random_index = (self.current_random_index - 1) % len(self.random_list)
-            self.load_work(self.random_list[self.current_random_index])
+            self.load_random_position(self.current_random_index - 1, -1)
+    
+    def cycle_browse_order(self):
+        """Switch to the next browse order, keeping the current post"""
+        if self.in_artist_menu:
+            return
+        
+        idx = BROWSE_ORDERS.index(self.browse_order)
+        self.browse_order = BROWSE_ORDERS[(idx + 1) % len(BROWSE_ORDERS)]
+        
+        if self.browse_order not in ('random', 'shuffle'):
+            index = self.browse.get(self.browse_order, on_ready=self.on_browse_index_ready)
+            position = index.position(self.state.current_post_id) if index else None
+            self.browse_position = position if position is not None else 0
+        
+        self.root.title(f"Pixiv Offline Viewer - {self.browse_order}")
+        print(f"Browse order: {self.browse_order}")
     
-    def load_work(self, post_id):
+    def on_browse_index_ready(self, index):
+        """A browse order finished building in the background - start from the current post"""
+        if self.browse.indexes.get(self.browse_order) is index:
+            position = index.position(self.state.current_post_id)
+            self.browse_position = position if position is not None else 0
+    
+    def step_browse_order(self, step):
+        """Move through the current sorted or weighted browse order"""
+        if self.browse_order == 'shuffle':
+            post_id = self.shuffle.next() if step > 0 else self.shuffle.prev()
+            if post_id:
+                self.load_work(post_id)
+            return
+        
+        index = self.browse.get(self.browse_order)
+        if index is None:
+            print(f"{self.browse_order} order is still being built...")
+            return
+        if not len(index):
+            return
+        
+        position = index.position(self.state.current_post_id)
+        if position is None:
+            # Current post was removed - the next one now sits at its old position
+            position = self.browse_position - 1 if step > 0 else self.browse_position
+        
+        self.browse_position = (position + step) % len(index)
+        self.load_work(index.post_at(self.browse_position))
+    
+    def load_work(self, post_id, page_idx=0):
         """Load a specific work"""
         work_files = self.file_manager.get_post_files(post_id)
         if not work_files:
             return
         
         self.state.set_work(post_id, work_files)
+        if 0 < page_idx < len(work_files):
+            self.state.current_page_idx = page_idx
+        
+        position = self.random_order.position(post_id) if self.random_order else None
+        if position is not None:
+            self.current_random_index = position
+        
+        self.request_display()
+    
+    def request_display(self):
+        """
+        Show the current work. Navigations arriving faster than
+        NAV_SKIM_THRESHOLD_MS (a held arrow key) only show the cached
+        thumbnail; the full load happens once they stop for NAV_SETTLE_MS.
+        """
+        now = time.monotonic()
+        skimming = (now - self.last_nav_time) * 1000 < NAV_SKIM_THRESHOLD_MS
+        self.last_nav_time = now
+        
+        if self.settle_after_id:
+            self.root.after_cancel(self.settle_after_id)
+            self.settle_after_id = None
+        
+        if not skimming:
+            self.settle_display()
+            return
+        
+        current_file = self.state.get_current_file()
+        if current_file:
+            self.media_viewer.show_skim(current_file, self.thumbnails)
+            self.controls.update_info()
+            # The previous post's page list would be misleading while skimming
+            if self.sidebar.exists() and not self.sidebar.is_showing(self.state.current_work):
+                self.sidebar.destroy()
+        self.settle_after_id = self.root.after(NAV_SETTLE_MS, self.settle_display)
+    
+    def settle_display(self):
+        """Full-resolution load of the post navigation stopped on"""
+        self.settle_after_id = None
         self.root.update_idletasks()
         self.update_display()
-        
-        if post_id in self.random_list:
-            self.current_random_index = self.random_list.index(post_id)
+        self.prefetch_neighbourhood(self.state.current_post_id)
     
     def update_display(self):
         """Update all UI elements for current work"""
@@ -190,13 +512,9 @@ class MainWindow:
         if not current_file:
             return
         
-        # Load media
-        success = self.media_viewer.load_media(current_file)
-        
-        if not success:
-            # Try to load next work
-            self.root.after(100, self.handle_right_arrow)
-            return
+        # Load media (decoded in the background, unless the prefetcher already did)
+        self.media_viewer.load_media(current_file, self.on_media_loaded,
+                                     self.prefetcher.take(current_file))
         
         # Update sidebar for multi-page works
         if len(self.state.current_work) > 1:
@@ -210,6 +528,12 @@ class MainWindow:
         self.controls.update_info()
         self.root.update_idletasks()
     
+    def on_media_loaded(self, success):
+        """Called once the current file is shown or failed to load"""
+        if not success:
+            # Try to load next work
+            self.root.after(100, self.handle_right_arrow)
+    
     def on_page_select(self, page_idx):
         """Handle page selection from sidebar"""
         self.state.current_page_idx = page_idx
@@ -243,18 +567,17 @@ class MainWindow:
         
         if post_id and self.file_manager.delete_file(filename):
             self.database.remove_file(filename)
+            self.browse.on_post_changed(post_id)
+            self.shuffle.on_post_changed(post_id)
             
-            if post_id in self.random_list:
-                self.random_list.remove(post_id)
-                if self.current_random_index >= len(self.random_list):
-                    self.current_random_index = max(0, len(self.random_list) - 1)
+            # Other pages keep the post in the library (and in the random order)
+            if post_id not in self.file_manager.all_posts:
+                self.random_order.remove(post_id)
             
             if self.state.current_post_id in self.file_manager.all_posts:
                 self.load_work(self.state.current_post_id)
             else:
-                if self.random_list:
-                    self.current_random_index = min(self.current_random_index, len(self.random_list) - 1)
-                    self.load_work(self.random_list[self.current_random_index])
+                self.load_random_position(self.current_random_index)
     
     def show_artist_menu(self):
         """Show artist menu for current artist"""
@@ -365,16 +688,15 @@ class MainWindow:
         
         if self.file_manager.delete_file(filename):
             self.database.remove_file(filename)
+            self.browse.on_post_changed(post_id)
+            self.shuffle.on_post_changed(post_id)
             
-            if post_id in self.random_list:
-                self.random_list.remove(post_id)
-                if self.current_random_index >= len(self.random_list):
-                    self.current_random_index = max(0, len(self.random_list) - 1)
+            # Other pages keep the post in the library - it is shown again with those
+            if post_id not in self.file_manager.all_posts:
+                self.random_order.remove(post_id)
             
             if self.file_manager.all_posts:
-                if self.random_list:
-                    self.current_random_index = min(self.current_random_index, len(self.random_list) - 1)
-                    self.load_work(self.random_list[self.current_random_index])
+                self.load_random_position(self.current_random_index)
             else:
                 print("No more files.")
     
@@ -389,16 +711,18 @@ class MainWindow:
         
         if self.file_manager.move_file(filename, target_folder):
             self.database.remove_file(filename)
+            self.browse.on_post_changed(post_id)
+            self.shuffle.on_post_changed(post_id)
+            
+            if post_id in self.file_manager.all_posts:
+                # Moved into another library root (or other pages stay) - still browsable
+                self.load_random_position(self.current_random_index + 1, 1)
+                return
             
-            if post_id in self.random_list:
-                self.random_list.remove(post_id)
-                if self.current_random_index >= len(self.random_list):
-                    self.current_random_index = max(0, len(self.random_list) - 1)
+            self.random_order.remove(post_id)
             
             if self.file_manager.all_posts:
-                if self.random_list:
-                    self.current_random_index = min(self.current_random_index, len(self.random_list) - 1)
-                    self.load_work(self.random_list[self.current_random_index])
+                self.load_random_position(self.current_random_index)
     
     def toggle_video_playback(self):
         """Toggle video play/pause"""
@@ -5,6 +5,9 @@ import threading
 import time
 from config import *
 from utils.zoom_engine import SmoothZoomEngine
+from core.media_loader import decode_media, release_media
+from core.scheduler import get_scheduler, PRIORITY_VISIBLE_IMAGE, PRIORITY_VIDEO_FRAME
+from ui.thumbnail_service import ThumbnailRequests
 
 class MediaViewer:
     def __init__(self, root, main_window=None):
@@ -18,6 +21,11 @@ class MediaViewer:
         self.tk_image = None
         self.current_is_video = False
         self.current_render_id = 0  # Track render versions
+        self.skim_requests = ThumbnailRequests()
+        
+        # Background decoding (see load_media)
+        self.scheduler = get_scheduler()
+        self.pending_load = None
         
         # Video playback state
         self.video_capture = None
@@ -31,6 +39,11 @@ class MediaViewer:
         # Video thread control
         self.video_thread_active = False
         
+        # Animation (ugoira) playback state
+        self.animation = None
+        self.animation_after_id = None
+        self.current_is_animation = False
+        
         # Video controls UI
         self.video_controls_frame = None
         self.play_pause_btn = None
@@ -92,100 +105,211 @@ class MediaViewer:
 
         self.zoom_engine.pan(dx, dy)
     
-    def load_media(self, file_info):
-        """Load image or video"""
+    def load_media(self, file_info, on_done=None, decoded=None):
+        """
+        Load image or video. Decoding runs on a worker thread; only the
+        newest request is shown. on_done(success) is called on the Tk thread
+        once the media is shown or failed to load. A result the prefetcher
+        already decoded is shown right away.
+        """
         # Stop any playing video
         self.stop_video()
         
-        path = file_info['full_path']
-        filename = file_info['filename'].lower()
+        # Newer than any skim thumbnail or load still on its way
+        self.current_render_id += 1
+        self.skim_requests.cancel()
+        if self.pending_load:
+            self.pending_load.cancel()
+            self.pending_load = None
         
-        # Check if it's a video
-        self.current_is_video = any(filename.endswith(ext) for ext in SUPPORTED_VIDEO_EXTS)
+        if decoded is not None:
+            self.show_media(self.current_render_id, file_info, decoded, None, on_done)
+            return
         
-        if self.current_is_video:
-            return self.load_video_simple(path)
-        else:
-            return self.load_image(path)
+        self.pending_load = self.scheduler.submit(self.decode_worker, file_info,
+                                                  self.current_render_id, on_done,
+                                                  priority=PRIORITY_VISIBLE_IMAGE,
+                                                  path=file_info['full_path'])
     
-    def load_image(self, path):
-        """Load and display image with zoom"""
+    def decode_worker(self, file_info, render_id, on_done):
+        """Worker: decode, then hand the result to the Tk thread"""
+        if render_id != self.current_render_id:
+            return  # Superseded before it started
+        
         try:
-            self.current_image = Image.open(path).convert('RGB')
-            
-            # Hide video controls
-            self.hide_video_controls()
-            
-            # Clear video indicator
-            self.canvas.delete('video_indicator')
-            
-            # Show canvas
-            self.canvas.pack(fill=tk.BOTH, expand=True)
-            
-            # Instant fit to window
-            self.root.update_idletasks()
-            canvas_width = self.canvas.winfo_width() or 800
-            canvas_height = self.canvas.winfo_height() or 600
-            
-            self.zoom_engine.instant_fit(canvas_width, canvas_height)
-            return True
+            result, error = decode_media(file_info), None
         except Exception as e:
-            print(f"Error loading image {path}: {e}")
-            return False
+            result, error = None, e
+        
+        self.root.after(0, lambda: self.show_media(render_id, file_info, result, error, on_done))
     
-    def load_video_simple(self, path):
-        """Simple video loader that shows first frame with play button"""
-        self.current_video_path = path
+    def show_media(self, render_id, file_info, result, error, on_done):
+        """Tk thread: show a decoded result unless a newer request replaced it"""
+        if render_id != self.current_render_id:
+            release_media(result)
+            return
         
-        try:
-            # Load first frame as image
-            success = self.load_video_frame_as_image(path)
-            
-            if success:
-                # Add small play button overlay
-                self.add_video_indicator()
-                self.canvas.update_idletasks()
-                return True
-            else:
-                return False
-                
-        except Exception as e:
-            print(f"Error loading video {path}: {e}")
-            return False
+        self.pending_load = None
+        if error is not None:
+            print(f"Error loading {file_info['filename']}: {error}")
+        elif result['kind'] == 'animation':
+            self.show_animation(result['source'], result['image'])
+        elif result['kind'] == 'video':
+            self.show_video_poster(result)
+        else:
+            self.show_image(result['image'])
+        
+        if on_done:
+            on_done(error is None)
     
-    def load_video_frame_as_image(self, path):
-        """Load first frame of video as image"""
-        try:
-            cap = cv2.VideoCapture(path)
-            ret, frame = cap.read()
-            
-            # Get video metadata
-            self.video_fps = cap.get(cv2.CAP_PROP_FPS) or 30
-            self.video_total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            cap.release()
-            
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                self.current_image = Image.fromarray(frame_rgb)
-                
-                # Hide video controls initially
-                self.hide_video_controls()
-                
-                # Show canvas
-                self.canvas.pack(fill=tk.BOTH, expand=True)
-                
-                # Fit to window
-                self.root.update_idletasks()
-                canvas_width = self.canvas.winfo_width() or 800
-                canvas_height = self.canvas.winfo_height() or 600
-                
-                self.zoom_engine.instant_fit(canvas_width, canvas_height)
-                return True
-        except Exception as e:
-            print(f"Error loading video frame: {e}")
+    def show_skim(self, file_info, thumbnails):
+        """Fast-skim: show the post's cached thumbnail instead of decoding it"""
+        self.stop_video()
+        self.current_render_id += 1
+        render_id = self.current_render_id
         
-        return False
+        self.current_image = None
+        self.skim_requests.cancel()
+        self.skim_requests = ThumbnailRequests()
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        thumbnails.load_async(file_info, lambda photo: self.draw_skim(render_id, photo),
+                              self.skim_requests)
+    
+    def draw_skim(self, render_id, photo):
+        """Draw a skim thumbnail unless something newer was shown meanwhile"""
+        if render_id != self.current_render_id:
+            return
+        
+        self.canvas.delete('all')
+        self.tk_image = photo
+        self.canvas.create_image((self.canvas.winfo_width() or 800) // 2,
+                                 (self.canvas.winfo_height() or 600) // 2,
+                                 image=photo)
+    
+    def show_image(self, img):
+        """Display a decoded image with zoom"""
+        self.current_image = img
+        
+        # Hide video controls
+        self.hide_video_controls()
+        
+        # Clear video indicator
+        self.canvas.delete('video_indicator')
+        
+        # Show canvas
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        # Instant fit to window
+        self.root.update_idletasks()
+        canvas_width = self.canvas.winfo_width() or 800
+        canvas_height = self.canvas.winfo_height() or 600
+        
+        self.zoom_engine.instant_fit(canvas_width, canvas_height)
+    
+    def show_animation(self, source, first_frame):
+        """Show first frame of an animation and start the frame scheduler"""
+        self.animation = source
+        self.current_is_animation = True
+        self.current_image = first_frame
+        source.start()
+        
+        # Let the video controls drive the animation
+        self.video_total_frames = source.frame_count
+        self.video_fps = source.frame_count / max(0.001, source.total_duration())
+        self.video_current_frame = 0
+        
+        self.canvas.delete('video_indicator')
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.root.update_idletasks()
+        canvas_width = self.canvas.winfo_width() or 800
+        canvas_height = self.canvas.winfo_height() or 600
+        self.zoom_engine.instant_fit(canvas_width, canvas_height)
+        
+        self.start_animation_playback()
+    
+    def start_animation_playback(self):
+        """Start the frame scheduler for the current animation"""
+        if not self.animation:
+            return
+        
+        self.show_video_controls()
+        self.play_pause_btn.config(text="⏸")
+        self.video_playing = True
+        self.animation_tick(self.animation)
+    
+    def animation_tick(self, source):
+        """Frame scheduler - shows each frame for its own delay"""
+        self.animation_after_id = None
+        if source is not self.animation:
+            return
+        
+        if not self.video_playing or self.slider_dragging:
+            # Paused - keep following the slider
+            frame = source.get_frame(self.video_current_frame)
+            if frame is not None and frame is not self.current_image:
+                self.current_image = frame
+                self.render()
+            self.animation_after_id = self.root.after(50, lambda: self.animation_tick(source))
+            return
+        
+        start = time.time()
+        idx = self.video_current_frame
+        frame = source.get_frame(idx)
+        
+        if frame is None:
+            if idx in source.failed:
+                # Skip undecodable frames
+                self.video_current_frame = (idx + 1) % source.frame_count
+            # Otherwise the worker hasn't caught up yet - check again shortly
+            self.animation_after_id = self.root.after(5, lambda: self.animation_tick(source))
+            return
+        
+        self.current_image = frame
+        self.render_video_frame()
+        self.update_video_ui()
+        
+        self.video_current_frame = (idx + 1) % source.frame_count
+        elapsed_ms = int((time.time() - start) * 1000)
+        delay = max(1, source.get_delay(idx) - elapsed_ms)
+        self.animation_after_id = self.root.after(delay, lambda: self.animation_tick(source))
+    
+    def stop_animation(self):
+        """Stop animation playback and release its decoder"""
+        if self.animation_after_id:
+            self.root.after_cancel(self.animation_after_id)
+            self.animation_after_id = None
+        
+        if self.animation:
+            self.animation.close()
+            self.animation = None
+        
+        self.current_is_animation = False
+    
+    def show_video_poster(self, result):
+        """Show the first frame of a video with a play button"""
+        self.current_is_video = True
+        self.current_video_path = result['path']
+        self.video_fps = result['fps']
+        self.video_total_frames = result['total_frames']
+        self.current_image = result['image']
+        
+        # Hide video controls initially
+        self.hide_video_controls()
+        
+        # Show canvas
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        # Fit to window
+        self.root.update_idletasks()
+        canvas_width = self.canvas.winfo_width() or 800
+        canvas_height = self.canvas.winfo_height() or 600
+        
+        self.zoom_engine.instant_fit(canvas_width, canvas_height)
+        
+        # Add small play button overlay
+        self.add_video_indicator()
     
     def add_video_indicator(self):
         """Add a play button overlay in the center"""
@@ -250,6 +374,7 @@ class MediaViewer:
     def show_video_controls(self):
         """Show video playback controls at the bottom"""
         if self.video_controls_frame:
+            self.video_slider.config(to=max(1, self.video_total_frames - 1))
             self.video_controls_frame.pack(side=tk.BOTTOM, fill=tk.X)
             return
         
@@ -357,11 +482,11 @@ class MediaViewer:
             
             while self.video_thread_active:
                 if self.video_playing and not self.slider_dragging:
-                    # Set frame position
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, self.video_current_frame)
-                    
-                    # Read frame
-                    ret, frame = cap.read()
+                    # Read frame (through the scheduler, ahead of thumbnails and prefetch)
+                    ret, frame = self.scheduler.submit(
+                        self.read_video_frame, cap, self.video_current_frame,
+                        priority=PRIORITY_VIDEO_FRAME, path=self.current_video_path
+                    ).result()
                     
                     if not ret:
                         # Loop video
@@ -394,6 +519,11 @@ class MediaViewer:
                 cap.release()
             self.video_thread_active = False
     
+    def read_video_frame(self, cap, frame_idx):
+        """Seek and read one frame (runs on a scheduler worker)"""
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        return cap.read()
+    
     def render_video_frame(self):
         """Render current video frame to canvas - preserve original quality, no downscaling"""
         if not self.current_image:
@@ -461,6 +591,9 @@ class MediaViewer:
         self.video_thread_active = False
         self.video_playing = False
         
+        # Stop ugoira/animated playback
+        self.stop_animation()
+        
         # Hide video controls
         self.hide_video_controls()
         
@@ -537,7 +670,9 @@ class MediaViewer:
     
     def toggle_video_playback(self):
         """Toggle video play/pause - for spacebar compatibility"""
-        if self.current_is_video:
+        if self.current_is_animation:
+            self.toggle_playback()
+        elif self.current_is_video:
             if self.video_playing or self.video_controls_frame:
                 # Video is already playing or controls are visible, toggle playback
                 self.toggle_playback()
@@ -1,83 +1,117 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 from config import *
-import os
+from ui.thumbnail_service import ThumbnailRequests
 
 class Sidebar:
-    def __init__(self, root, on_page_select, on_page_delete):
+    def __init__(self, root, on_page_select, on_page_delete, thumbnails):
         self.root = root
         self.on_page_select = on_page_select
         self.on_page_delete = on_page_delete
+        self.thumbnails = thumbnails  # Shared ThumbnailService
         
         self.frame = None
         self.canvas = None
-        self.thumb_frame = None
-        self.thumb_buttons = []
-        self.thumb_images = []
+        self.work_files = []
+        self.filenames = []
+        self.current_idx = -1
+        
+        # Virtualized rows
+        self.cells = []        # All created cells (pool)
+        self.bound_cells = {}  # page index -> cell currently showing it
     
     def create(self, work_files, current_page_idx):
-        """Create sidebar with properly sized thumbnails"""
+        """
+        Create sidebar for a post. If the sidebar already shows this post,
+        keep it alive and only move the highlight.
+        """
+        if self.exists() and self.is_showing(work_files):
+            self.highlight_thumbnail(current_page_idx)
+            return self.frame
+        
         self.destroy()
         
         if len(work_files) <= 1:
             return None
         
+        self.work_files = work_files
+        self.filenames = [f['filename'] for f in work_files]
+        
         # Create main frame
         self.frame = tk.Frame(self.root, bg='#2d2d2d', width=SIDEBAR_WIDTH)
         self.frame.place(relx=1.0, rely=0.1, anchor='ne', x=-10, y=0, relheight=0.7)
         self.frame.pack_propagate(False)
         
-        # Canvas WITHOUT scrollbar
-        self.canvas = tk.Canvas(self.frame, bg='#2d2d2d', 
-                               highlightthickness=0, width=SIDEBAR_WIDTH)
-        self.thumb_frame = tk.Frame(self.canvas, bg='#2d2d2d')
-        
+        # Canvas WITHOUT scrollbar - rows are windows placed on it
+        self.canvas = tk.Canvas(self.frame, bg='#2d2d2d',
+                               highlightthickness=0, width=SIDEBAR_WIDTH,
+                               yscrollincrement=GRID_SCROLL_STEP)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.canvas.create_window((0, 0), window=self.thumb_frame, anchor=tk.NW)
-        
-        # Create thumbnails with proper size
-        self.thumb_buttons = []
-        self.thumb_images = []
-        
-        for idx, page_info in enumerate(work_files):
-            self.create_thumbnail(idx, page_info)
+        self.canvas.config(scrollregion=(0, 0, SIDEBAR_WIDTH, len(work_files) * SIDEBAR_ROW_HEIGHT),
+                           yscrollcommand=lambda first, last: self.refresh_visible())
+        self.canvas.bind('<Configure>', lambda e: self.refresh_visible())
         
         # Bind mouse wheel for scrolling
-        self.canvas.bind("<MouseWheel>", self.on_mousewheel)
-        self.canvas.bind("<Button-4>", self.on_mousewheel_linux)
-        self.canvas.bind("<Button-5>", self.on_mousewheel_linux)
+        self.bind_mousewheel(self.canvas)
         
-        self.thumb_frame.update_idletasks()
-        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        # Real canvas height is needed to know which rows are visible
+        self.frame.update_idletasks()
         self.highlight_thumbnail(current_page_idx)
         
         return self.frame
     
-    def create_thumbnail(self, idx, page_info):
-        """Create a thumbnail with proper size (120x120)"""
+    def is_showing(self, work_files):
+        """Check if the sidebar was built for exactly these files"""
+        return len(work_files) == len(self.filenames) and \
+            all(f['filename'] == name for f, name in zip(work_files, self.filenames))
+    
+    def bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_mousewheel)
+        widget.bind("<Button-4>", self.on_mousewheel_linux)
+        widget.bind("<Button-5>", self.on_mousewheel_linux)
+    
+    def visible_range(self):
+        """Page indices in view plus overscan"""
+        top = self.canvas.canvasy(0)
+        bottom = top + (self.canvas.winfo_height() or SIDEBAR_ROW_HEIGHT)
+        
+        first = max(0, int(top // SIDEBAR_ROW_HEIGHT) - GRID_OVERSCAN_ROWS)
+        last = min(len(self.work_files) - 1, int(bottom // SIDEBAR_ROW_HEIGHT) + GRID_OVERSCAN_ROWS)
+        return range(first, last + 1)
+    
+    def refresh_visible(self):
+        """Bind cells to visible pages and recycle the rest"""
+        if not self.canvas:
+            return
+        
+        visible = self.visible_range()
+        
+        for idx in list(self.bound_cells):
+            if idx not in visible:
+                self.release_cell(idx)
+        
+        # Nearest to the current page first, so its thumbnail decodes first
+        for idx in sorted(visible, key=lambda i: abs(i - self.current_idx)):
+            if idx not in self.bound_cells:
+                self.bind_cell(idx)
+    
+    def create_cell(self):
+        """Create a reusable thumbnail row with proper size (120x120)"""
         # Create container frame with fixed width
-        container = tk.Frame(self.thumb_frame, bg='#2d2d2d', 
+        container = tk.Frame(self.canvas, bg='#2d2d2d',
                            width=SIDEBAR_WIDTH-20, height=140)
-        container.pack(pady=5, padx=5, fill=tk.X)
         container.pack_propagate(False)
         
         # Create inner frame for content
         content_frame = tk.Frame(container, bg='#2d2d2d')
         content_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Load thumbnail
-        thumb_img = self.load_thumbnail(page_info['filename'])
-        
         # Create thumbnail button
         btn_frame = tk.Frame(content_frame, bg='#3d3d3d', relief='sunken', bd=1)
         btn_frame.pack(side=tk.LEFT, padx=(0, 5))
         
-        btn = tk.Button(btn_frame, image=thumb_img,
-                       command=lambda i=idx: self.on_page_select(i),
-                       bg='#3d3d3d', relief='flat',
+        btn = tk.Button(btn_frame, bg='#3d3d3d', relief='flat',
                        cursor='hand2', bd=0)
-        btn.image = thumb_img
         btn.pack(padx=2, pady=2)
         
         # Info frame
@@ -85,90 +119,109 @@ class Sidebar:
         info_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Page number
-        page_label = tk.Label(info_frame, text=f"Page {page_info['page']}",
-                             bg='#2d2d2d', fg='white', 
+        page_label = tk.Label(info_frame, text="",
+                             bg='#2d2d2d', fg='white',
                              font=('Segoe UI', 9, 'bold'))
         page_label.pack(anchor='w', pady=(0, 5))
         
         # Delete button
         del_btn = tk.Button(info_frame, text="❌ Delete",
-                           command=lambda f=page_info['filename']: self.on_page_delete(f),
                            bg='#f44336', fg='white',
                            font=('Segoe UI', 8), width=8, height=1)
         del_btn.pack(anchor='w')
         
-        self.thumb_buttons.append(btn)
-        self.thumb_images.append(thumb_img)
+        for widget in (container, content_frame, btn, info_frame, page_label):
+            self.bind_mousewheel(widget)
+        
+        cell = {
+            'button': btn,
+            'page_label': page_label,
+            'delete': del_btn,
+            'window': self.canvas.create_window(5, 0, window=container, anchor=tk.NW),
+            'idx': None,
+            'requests': ThumbnailRequests()
+        }
+        self.cells.append(cell)
+        return cell
     
-    def load_thumbnail(self, filename):
-        """Load or create thumbnail image with proper size"""
-        from config import FIXED_FOLDER_PATH
-        path = os.path.join(FIXED_FOLDER_PATH, filename)
-        
-        try:
-            if filename.lower().endswith(SUPPORTED_IMAGE_EXTS):
-                img = Image.open(path)
-                # Resize to fixed thumbnail size
-                img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
-                return ImageTk.PhotoImage(img)
-            elif filename.lower().endswith(SUPPORTED_VIDEO_EXTS):
-                return self.create_video_thumbnail()
-        except Exception as e:
-            print(f"Error loading thumbnail {filename}: {e}")
-        
-        # Fallback thumbnail
-        return self.create_fallback_thumbnail()
+    def bind_cell(self, idx):
+        """Show page idx in a free (or new) cell"""
+        cell = next((c for c in self.cells if c['idx'] is None), None) or self.create_cell()
+        page_info = self.work_files[idx]
+        
+        cell['idx'] = idx
+        self.bound_cells[idx] = cell
+        
+        self.canvas.coords(cell['window'], 5, idx * SIDEBAR_ROW_HEIGHT + 5)
+        self.canvas.itemconfigure(cell['window'], state='normal')
+        
+        # Placeholder until the real thumbnail is decoded
+        thumb_img = self.thumbnails.peek(page_info) or self.thumbnails.fallback()
+        btn = cell['button']
+        btn.config(image=thumb_img,
+                   command=lambda i=idx: self.on_page_select(i),
+                   bg='#ffeb3b' if idx == self.current_idx else '#3d3d3d')
+        btn.image = thumb_img
+        
+        cell['page_label'].config(text=f"Page {page_info['page']}")
+        cell['delete'].config(command=lambda f=page_info['filename']: self.on_page_delete(f))
+        
+        cell['requests'] = ThumbnailRequests()
+        self.thumbnails.load_async(page_info,
+                                   lambda photo, c=cell, i=idx: self.set_thumbnail(c, i, photo),
+                                   cell['requests'])
     
-    def create_video_thumbnail(self):
-        """Create a video icon thumbnail"""
-        from PIL import Image, ImageDraw
-        
-        img = Image.new('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE), '#3d3d3d')
-        draw = ImageDraw.Draw(img)
-        
-        # Draw a play button triangle
-        size = THUMBNAIL_SIZE
-        triangle_size = size // 3
-        x1 = (size - triangle_size) // 2
-        y1 = (size - triangle_size) // 2
-        x2 = x1 + triangle_size
-        y2 = y1 + triangle_size
-        
-        draw.polygon([(x1, y1), (x1, y2), (x2, (y1+y2)//2)], fill='#ff0000')
-        
-        # Add "VIDEO" text
-        from PIL import ImageFont
-        try:
-            font = ImageFont.truetype("arial.ttf", 10)
-            draw.text((5, 5), "VIDEO", fill='white', font=font)
-        except:
-            draw.text((5, 5), "VIDEO", fill='white')
-        
-        return ImageTk.PhotoImage(img)
+    def release_cell(self, idx):
+        """Return a cell to the pool"""
+        cell = self.bound_cells.pop(idx)
+        cell['requests'].cancel()
+        cell['idx'] = None
+        self.canvas.itemconfigure(cell['window'], state='hidden')
     
-    def create_fallback_thumbnail(self):
-        """Create a fallback thumbnail"""
-        img = Image.new('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE), '#3d3d3d')
-        return ImageTk.PhotoImage(img)
+    def set_thumbnail(self, cell, idx, photo):
+        """Swap a placeholder for its decoded thumbnail"""
+        if cell['idx'] == idx:
+            cell['button'].config(image=photo)
+            cell['button'].image = photo
     
     def highlight_thumbnail(self, idx):
-        """Highlight the current page's thumbnail"""
-        for btn in self.thumb_buttons:
-            btn.config(bg='#3d3d3d')
-        
-        if 0 <= idx < len(self.thumb_buttons):
-            self.thumb_buttons[idx].config(bg='#ffeb3b')
+        """Highlight the current page's thumbnail and keep it in view"""
+        old = self.bound_cells.get(self.current_idx)
+        if old:
+            old['button'].config(bg='#3d3d3d')
+        
+        self.current_idx = idx
+        if not self.canvas or not (0 <= idx < len(self.work_files)):
+            return
+        
+        # Scroll so the highlighted row is visible
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height() or SIDEBAR_ROW_HEIGHT
+        row_top = idx * SIDEBAR_ROW_HEIGHT
+        total = len(self.work_files) * SIDEBAR_ROW_HEIGHT
+        if row_top < top or row_top + SIDEBAR_ROW_HEIGHT > top + height:
+            self.canvas.yview_moveto(max(0, row_top - (height - SIDEBAR_ROW_HEIGHT) / 2) / total)
+        
+        self.refresh_visible()
+        cell = self.bound_cells.get(idx)
+        if cell:
+            cell['button'].config(bg='#ffeb3b')
     
     def destroy(self):
         """Destroy sidebar"""
+        for cell in self.cells:
+            cell['requests'].cancel()
+        
         if self.frame and self.frame.winfo_exists():
             self.frame.destroy()
         
         self.frame = None
         self.canvas = None
-        self.thumb_frame = None
-        self.thumb_buttons = []
-        self.thumb_images = []
+        self.work_files = []
+        self.filenames = []
+        self.current_idx = -1
+        self.cells = []
+        self.bound_cells = {}
     
     def exists(self):
         """Check if sidebar exists"""
@@ -177,12 +230,12 @@ class Sidebar:
     def on_mousewheel(self, event):
         """Handle mouse wheel scrolling"""
         if self.canvas:
-            self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+            self.canvas.yview_scroll(int(-1*(event.delta/120)) * GRID_WHEEL_STEPS, "units")
     
     def on_mousewheel_linux(self, event):
         """Handle Linux mouse wheel"""
         if self.canvas:
             if event.num == 4:
-                self.canvas.yview_scroll(-1, "units")
+                self.canvas.yview_scroll(-GRID_WHEEL_STEPS, "units")
             elif event.num == 5:
-                self.canvas.yview_scroll(1, "units")
\ No newline at end of file
+                self.canvas.yview_scroll(GRID_WHEEL_STEPS, "units")
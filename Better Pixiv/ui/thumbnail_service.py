@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from PIL import Image, ImageTk
+from config import *
+from core.thumbnail_cache import ThumbnailCache
+from core.scheduler import get_scheduler, PRIORITY_THUMBNAIL, PRIORITY_BACKGROUND
+from core.archive import media_stat
+
+def file_signature(file_info):
+    """(size, mtime) of a file as it is now, or None if it's gone"""
+    try:
+        st = media_stat(file_info)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+class ThumbnailRequests:
+    """A batch of async thumbnail loads that can be cancelled together"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.futures = []
+
+    def cancel(self):
+        """Drop pending decodes and ignore results still in flight"""
+        self.cancelled = True
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
+
+class ThumbnailService:
+    """
+    Thumbnails shared by Sidebar and ArtistMenu:
+    disk cache of downscaled images + in-memory LRU of ready PhotoImages.
+    Decoding runs on the shared scheduler; PhotoImages are only made on the Tk thread.
+    Memory entries remember the file's size and mtime. Files the watcher
+    reports are dropped via forget(); async memory hits are also re-checked
+    on a worker, and a file rewritten in place gets a fresh thumbnail.
+    Nothing is stat'ed on the Tk thread for a hit.
+    """
+
+    def __init__(self, root, disk_cache=None, max_items=THUMB_MEMORY_ITEMS):
+        self.root = root
+        self.disk_cache = disk_cache or ThumbnailCache()
+        self.max_items = max_items
+        self.photos = OrderedDict()  # (path, size) -> (PhotoImage, file signature)
+        self.fallbacks = {}
+        self.scheduler = get_scheduler()
+
+    def peek(self, file_info, size=THUMBNAIL_SIZE):
+        """Get a ready PhotoImage from memory, or None"""
+        key = (file_info['full_path'], size)
+        entry = self.photos.get(key)
+        if entry is None:
+            return None
+        self.photos.move_to_end(key)
+        return entry[0]
+
+    def get(self, file_info, size=THUMBNAIL_SIZE):
+        """Get a PhotoImage thumbnail synchronously (Tk thread only)"""
+        photo = self.peek(file_info, size)
+        if photo is not None:
+            return photo
+
+        signature = file_signature(file_info)
+        try:
+            img = self.disk_cache.get(file_info, size)
+        except Exception as e:
+            print(f"Error loading thumbnail {file_info['filename']}: {e}")
+            return self.fallback(size)
+
+        return self._remember(file_info, size, img, signature)
+
+    def load_async(self, file_info, callback, requests, size=THUMBNAIL_SIZE):
+        """
+        Load a thumbnail in the background and call callback(photo) on the Tk thread.
+        Memory hits call back immediately (and again if the file turns out to
+        have changed). Requests are decoded in submit order.
+        """
+        entry = self.photos.get((file_info['full_path'], size))
+        if entry is not None:
+            callback(self.peek(file_info, size))
+            future = self.scheduler.submit(self._revalidate, file_info, size, entry[1], callback, requests,
+                                           priority=PRIORITY_BACKGROUND, path=file_info['full_path'])
+            requests.futures.append(future)
+            return
+
+        future = self.scheduler.submit(self._decode, file_info, size, callback, requests,
+                                       priority=PRIORITY_THUMBNAIL, path=file_info['full_path'])
+        requests.futures.append(future)
+    
+    def warm(self, file_infos, size=THUMBNAIL_SIZE):
+        """Build disk-cached thumbnails for upcoming files at background priority"""
+        for file_info in file_infos:
+            self.scheduler.submit(self._warm_one, file_info, size,
+                                  priority=PRIORITY_BACKGROUND, path=file_info['full_path'])
+    
+    def _warm_one(self, file_info, size):
+        try:
+            self.disk_cache.get(file_info, size)
+        except Exception:
+            pass  # Reported when the thumbnail is actually shown
+
+    def _revalidate(self, file_info, size, signature, callback, requests):
+        """Worker: decode again if the file changed since its memory entry was made"""
+        if requests.cancelled or file_signature(file_info) == signature:
+            return
+        self._decode(file_info, size, callback, requests)
+
+    def _decode(self, file_info, size, callback, requests):
+        """Worker: decode (or read from disk cache) then hand over to Tk"""
+        if requests.cancelled:
+            return
+        signature = file_signature(file_info)
+        try:
+            img = self.disk_cache.get(file_info, size)
+        except Exception as e:
+            print(f"Error loading thumbnail {file_info['filename']}: {e}")
+            img = None
+
+        if not requests.cancelled:
+            self.root.after(0, lambda: self._apply(file_info, size, img, signature, callback, requests))
+
+    def _apply(self, file_info, size, img, signature, callback, requests):
+        """Tk thread: turn the decoded image into a PhotoImage"""
+        if requests.cancelled:
+            return
+        if img is None:
+            callback(self.fallback(size))
+        else:
+            callback(self._remember(file_info, size, img, signature))
+
+    def _remember(self, file_info, size, img, signature):
+        # Signature taken before decoding: a rewrite during it only costs a re-decode
+        photo = ImageTk.PhotoImage(img)
+        self.photos[(file_info['full_path'], size)] = (photo, signature)
+        while len(self.photos) > self.max_items:
+            self.photos.popitem(last=False)
+        return photo
+
+    def forget(self, paths):
+        """Drop in-memory thumbnails of files that changed or went away"""
+        for key in [key for key in self.photos if key[0] in paths]:
+            del self.photos[key]
+
+    def fallback(self, size=THUMBNAIL_SIZE):
+        """Plain placeholder tile"""
+        if size not in self.fallbacks:
+            self.fallbacks[size] = ImageTk.PhotoImage(
+                Image.new('RGB', (size, size), '#3d3d3d')
+            )
+        return self.fallbacks[size]
@@ -3,5 +3,6 @@ Utility modules
 """
 from .zoom_engine import SmoothZoomEngine
 from .clipboard import copy_to_clipboard, get_pixiv_url
+from .latency_monitor import LatencyMonitor
 
-__all__ = ['SmoothZoomEngine', 'copy_to_clipboard', 'get_pixiv_url']
\ No newline at end of file
+__all__ = ['SmoothZoomEngine', 'copy_to_clipboard', 'get_pixiv_url', 'LatencyMonitor']
\ No newline at end of file
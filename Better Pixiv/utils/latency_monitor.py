@@ -0,0 +1,51 @@
+import time
+from collections import deque
+from config import *
+
+class LatencyMonitor:
+    """
+    Measures how long the Tk event loop is blocked.
+
+    A timer is scheduled every interval; the amount it fires late is time
+    the Tk thread spent inside some other callback. test_latency.py uses it
+    to check that loading media never stalls the loop.
+    """
+
+    def __init__(self, root, interval_ms=LATENCY_MONITOR_INTERVAL_MS, warn_ms=LATENCY_WARN_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.warn_ms = warn_ms
+        self.lags = deque(maxlen=10000)
+        self.expected = None
+        self.after_id = None
+
+    def start(self):
+        self.expected = time.perf_counter() + self.interval_ms / 1000
+        self.after_id = self.root.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def tick(self):
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self.expected) * 1000)
+        self.lags.append(lag_ms)
+        if lag_ms > self.warn_ms:
+            print(f"UI thread blocked for {lag_ms:.0f} ms")
+
+        self.expected = now + self.interval_ms / 1000
+        self.after_id = self.root.after(self.interval_ms, self.tick)
+
+    def stats(self):
+        """(average, p99, max) lag in ms"""
+        if not self.lags:
+            return 0.0, 0.0, 0.0
+        lags = sorted(self.lags)
+        return sum(lags) / len(lags), lags[int(len(lags) * 0.99) - 1 if len(lags) > 1 else 0], lags[-1]
+
+    def report(self):
+        avg, p99, worst = self.stats()
+        print(f"Event loop lag: avg {avg:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms "
+              f"over {len(self.lags)} samples")